@@ -1,24 +1,428 @@
-with open("data.txt", "r") as fhandle:
-    data = fhandle.readlines()
-
-elf_calories = [[]]
-for raw_line in data:
-    line = raw_line.strip()  # remove \n
-    if line != "":
-        elf_calories[-1].append(int(line))
+import concurrent.futures
+import heapq
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import numpy
+
+
+def load_elf_calories(path) -> list[int]:
+    """Reference implementation: total calories carried by every elf
+
+    Reads the whole file into memory, so only use this for small inputs
+    or for checking the streaming engine against.
+
+    arguments:
+        path (os.PathLike): path to calorie list
+    returns:
+        elf_calories (list[int]): calorie sum per elf, in file order
+    """
+    with open(path, "r") as fhandle:
+        data = fhandle.readlines()
+
+    elf_calories = [[]]
+    for raw_line in data:
+        line = raw_line.strip()  # remove \n
+        if line != "":
+            elf_calories[-1].append(int(line))
+        else:
+            elf_calories.append([])
+
+    # inline replacement of list to sum of calories
+    for i, elf in enumerate(elf_calories):
+        elf_calories[i] = sum(elf_calories[i])
+    return elf_calories
+
+
+def __push_bounded(heap: list[int], value: int, k: int) -> None:
+    """Push value to a min-heap that holds at most k values
+
+    The smallest value sits at heap[0], so a new value only has to
+    beat that one to be part of the top k.
+    """
+    if len(heap) < k:
+        heapq.heappush(heap, value)
+    elif value > heap[0]:
+        heapq.heapreplace(heap, value)
+
+
+def top_k(path, k: int = 3) -> tuple[int, int]:
+    """Stream the calorie list once and keep only the k largest elves
+
+    Only the running sum of the current elf and a heap of size k are
+    kept in memory, so this works for files much larger than RAM.
+
+    arguments:
+        path (os.PathLike): path to calorie list
+        k (int): number of top elves to keep
+    returns:
+        max_calories (int): calories of the top elf (part 1)
+        top_k_calories (int): summed calories of the top k elves (part 2)
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    heap = []
+    current = 0
+    with open(path, "r") as fhandle:
+        for raw_line in fhandle:
+            line = raw_line.strip()  # remove \n
+            if line != "":
+                current += int(line)
+            else:
+                __push_bounded(heap, current, k)
+                current = 0
+    # the last elf is not followed by an empty line
+    __push_bounded(heap, current, k)
+    return max(heap), sum(heap)
+
+
+def __chunk_boundaries(path, n_chunks: int) -> list[int]:
+    """Split a file into n_chunks byte ranges that start at a line start
+
+    Every naive boundary is moved forward to the first byte after the
+    next newline, so no line is ever split over two chunks.
+
+    returns:
+        boundaries (list[int]): sorted offsets, first is 0, last is file size
+    """
+    with open(path, "rb") as fhandle:
+        fhandle.seek(0, 2)
+        size = fhandle.tell()
+        boundaries = [0]
+        for i in range(1, n_chunks):
+            naive = size * i // n_chunks
+            if naive <= boundaries[-1]:
+                continue
+            fhandle.seek(naive - 1)
+            fhandle.readline()
+            boundary = fhandle.tell()
+            if boundaries[-1] < boundary < size:
+                boundaries.append(boundary)
+        boundaries.append(size)
+    return boundaries
+
+
+def __chunk_top_k(path, start: int, end: int, k: int) -> tuple:
+    """Process the lines in byte range [start, end) of the calorie list
+
+    The first and last group in a chunk may continue in the
+    neighbouring chunks, so their partial sums are returned separately
+    and only the groups fully inside the chunk go into the heap.
+
+    returns:
+        head (int): sum of the lines before the first empty line
+        heap (list[int]): top k of the groups closed inside the chunk
+        tail (int): sum of the lines after the last empty line
+        has_separator (bool): whether the chunk contains an empty line
+    """
+    head = 0
+    heap = []
+    current = 0
+    has_separator = False
+    with open(path, "rb") as fhandle:
+        fhandle.seek(start)
+        position = start
+        while position < end:
+            raw_line = fhandle.readline()
+            if not raw_line:
+                break
+            position += len(raw_line)
+            line = raw_line.strip()
+            if line != b"":
+                current += int(line)
+            elif not has_separator:
+                head = current
+                current = 0
+                has_separator = True
+            else:
+                __push_bounded(heap, current, k)
+                current = 0
+    if not has_separator:
+        return current, heap, 0, False
+    return head, heap, current, True
+
+
+def parallel_top_k(path, k: int = 3, workers: int = None) -> tuple[int, int]:
+    """Same result as top_k, but the file is split over a process pool
+
+    The file is cut into byte ranges at line starts, and each range is
+    summed by a separate process. Groups that straddle a chunk boundary
+    are stitched together from the partial head and tail sums, after
+    which the per-chunk heaps are merged.
+
+    arguments:
+        path (os.PathLike): path to calorie list
+        k (int): number of top elves to keep
+        workers (int): number of processes, defaults to os.cpu_count()
+    returns:
+        max_calories (int): calories of the top elf (part 1)
+        top_k_calories (int): summed calories of the top k elves (part 2)
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    workers = workers or os.cpu_count() or 1
+    boundaries = __chunk_boundaries(path, workers)
+    starts, ends = boundaries[:-1], boundaries[1:]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(__chunk_top_k, itertools.repeat(path), starts,
+                           ends, itertools.repeat(k))
+        heap = []
+        open_group = 0
+        for head, chunk_heap, tail, has_separator in results:
+            if not has_separator:
+                open_group += head
+                continue
+            __push_bounded(heap, open_group + head, k)
+            for value in chunk_heap:
+                __push_bounded(heap, value, k)
+            open_group = tail
+    __push_bounded(heap, open_group, k)
+    return max(heap), sum(heap)
+
+
+NEWLINE = ord("\n")
+
+
+def __next_line_start(buf: numpy.ndarray, position: int,
+                      window: int = 4096) -> int:
+    """Return the first offset >= position at which a line starts"""
+    if position == 0 or buf[position - 1] == NEWLINE:
+        return position
+    while position < len(buf):
+        hits = numpy.flatnonzero(buf[position:position + window] == NEWLINE)
+        if len(hits):
+            return position + int(hits[0]) + 1
+        position += window
+    return len(buf)
+
+
+def __parse_block(block: numpy.ndarray) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Parse all integers in a block of whole lines at once
+
+    Every digit is weighted by 10 to the power of the number of digits
+    that follow it on the same line, after which a segmented sum over
+    the lines (reduceat) gives the value of each line. Lines without any
+    digits are the empty lines between elves.
+
+    arguments:
+        block (numpy.ndarray): uint8 bytes, starting at a line start
+    returns:
+        line_values (numpy.ndarray): int64 value of every line
+        is_blank (numpy.ndarray): True for every empty line
+    """
+    line_ends = numpy.flatnonzero(block == NEWLINE)
+    if len(line_ends) == 0 or line_ends[-1] != len(block) - 1:
+        # last line of the file is not terminated by a newline
+        line_ends = numpy.append(line_ends, len(block) - 1)
+    line_starts = numpy.concatenate(([0], line_ends[:-1] + 1))
+
+    digits = block.astype(numpy.int64) - ord("0")
+    is_digit = (digits >= 0) & (digits <= 9)
+    digits[~is_digit] = 0
+    digit_count = numpy.cumsum(is_digit)
+
+    digits_up_to_line_end = numpy.repeat(digit_count[line_ends],
+                                         line_ends - line_starts + 1)
+    exponent = digits_up_to_line_end - digit_count
+    line_values = numpy.add.reduceat(digits * 10 ** exponent, line_starts)
+
+    digits_per_line = numpy.diff(digit_count[line_ends], prepend=0)
+    return line_values, digits_per_line == 0
+
+
+def numpy_top_k(path, k: int = 3,
+                block_size: int = 1 << 22) -> tuple[int, int]:
+    """Same result as top_k, but parsed in bulk with numpy
+
+    The file is memory-mapped and handled in blocks of whole lines, so
+    the temporary arrays stay bounded by block_size. Per block, the elf
+    totals follow from a cumulative sum over the line values, read out
+    at the empty lines. The top k is kept with numpy.partition instead
+    of a full sort. Values are int64, which is plenty for calorie counts.
+
+    arguments:
+        path (os.PathLike): path to calorie list
+        k (int): number of top elves to keep
+        block_size (int): approximate number of bytes parsed at once
+    returns:
+        max_calories (int): calories of the top elf (part 1)
+        top_k_calories (int): summed calories of the top k elves (part 2)
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    if os.path.getsize(path) == 0:
+        return 0, 0
+    buf = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+
+    candidates = numpy.empty(0, dtype=numpy.int64)
+    open_group = 0
+    start = 0
+    while start < len(buf):
+        end = __next_line_start(buf, min(start + block_size, len(buf)))
+        line_values, is_blank = __parse_block(buf[start:end])
+        start = end
+
+        cumulative = numpy.cumsum(line_values)
+        blank_idx = numpy.flatnonzero(is_blank)
+        if len(blank_idx) == 0:
+            open_group += int(cumulative[-1])
+            continue
+        closed_ends = cumulative[blank_idx]
+        closed = numpy.diff(closed_ends, prepend=0)
+        closed[0] += open_group
+        open_group = int(cumulative[-1] - closed_ends[-1])
+
+        candidates = numpy.concatenate((candidates, closed))
+        if len(candidates) > k:
+            candidates = numpy.partition(candidates, -k)[-k:]
+
+    candidates = numpy.append(candidates, open_group)
+    if len(candidates) > k:
+        candidates = numpy.partition(candidates, -k)[-k:]
+    return int(candidates.max()), int(candidates.sum())
+
+
+def __new_checkpoint(k: int) -> dict:
+    return {"k": k, "offset": 0, "open_group": 0, "top_k": []}
+
+
+def __load_checkpoint(checkpoint_path, k: int) -> dict:
+    """Load a checkpoint, or start over if there is none or k changed"""
+    if not os.path.exists(checkpoint_path):
+        return __new_checkpoint(k)
+    with open(checkpoint_path, "r") as fhandle:
+        checkpoint = json.load(fhandle)
+    if checkpoint.get("k") != k:
+        return __new_checkpoint(k)
+    return checkpoint
+
+
+def __save_checkpoint(checkpoint_path, checkpoint: dict) -> None:
+    """Write via a temporary file so a crash never leaves half a checkpoint"""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as fhandle:
+        json.dump(checkpoint, fhandle)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def incremental_top_k(path, checkpoint_path=None,
+                      k: int = 3) -> tuple[int, int]:
+    """Same result as top_k, but only reads what was appended since last run
+
+    The checkpoint holds the byte offset up to which the file has been
+    processed, the partial sum of the elf that is still open and the top
+    k of all closed elves. Only complete lines are committed to the
+    checkpoint; a trailing line that is still being written is counted
+    for the answer but read again on the next run. If the file shrank
+    (truncated or rotated), the checkpoint is discarded.
+
+    arguments:
+        path (os.PathLike): path to append-only calorie list
+        checkpoint_path (os.PathLike): defaults to path + ".checkpoint"
+        k (int): number of top elves to keep
+    returns:
+        max_calories (int): calories of the top elf (part 1)
+        top_k_calories (int): summed calories of the top k elves (part 2)
+    """
+    if k < 1:
+        raise ValueError(f"k must be at least 1, got {k}")
+    if checkpoint_path is None:
+        checkpoint_path = f"{path}.checkpoint"
+    checkpoint = __load_checkpoint(checkpoint_path, k)
+    if os.path.getsize(path) < checkpoint["offset"]:
+        checkpoint = __new_checkpoint(k)
+
+    heap = checkpoint["top_k"]
+    heapq.heapify(heap)
+    offset = checkpoint["offset"]
+    current = checkpoint["open_group"]
+    partial_line = None
+    with open(path, "rb") as fhandle:
+        fhandle.seek(offset)
+        for raw_line in fhandle:
+            if not raw_line.endswith(b"\n"):
+                partial_line = raw_line.strip()
+                break
+            offset += len(raw_line)
+            line = raw_line.strip()
+            if line != b"":
+                current += int(line)
+            else:
+                __push_bounded(heap, current, k)
+                current = 0
+
+    checkpoint.update(offset=offset, open_group=current, top_k=heap)
+    __save_checkpoint(checkpoint_path, checkpoint)
+
+    # the answer treats the end of the file as the end of the last elf
+    answer_heap = list(heap)
+    if partial_line is None:
+        __push_bounded(answer_heap, current, k)
+    elif partial_line != b"":
+        __push_bounded(answer_heap, current + int(partial_line), k)
     else:
-        elf_calories.append([])
+        __push_bounded(answer_heap, current, k)
+        __push_bounded(answer_heap, 0, k)
+    return max(answer_heap), sum(answer_heap)
+
+
+def follow(path, checkpoint_path=None, k: int = 3, interval: float = 1.0):
+    """Yield updated answers whenever the calorie list grows
+
+    arguments:
+        path (os.PathLike): path to append-only calorie list
+        checkpoint_path (os.PathLike): defaults to path + ".checkpoint"
+        k (int): number of top elves to keep
+        interval (float): seconds between checks of the file size
+    yields:
+        max_calories (int), top_k_calories (int)
+    """
+    last_size = None
+    while True:
+        size = os.path.getsize(path)
+        if size != last_size:
+            last_size = size
+            yield incremental_top_k(path, checkpoint_path, k)
+        time.sleep(interval)
+
+
+def main():
+    max_calories, top_3_calories = top_k("data.txt", k=3)
+
+    # output target of exercise part 1
+    print("answer part 1")
+    print(max_calories)
+
+    print("answer part 2")
+    print(top_3_calories)
 
-# inline replacement of list to sum of calories
-for i, elf in enumerate(elf_calories):
-    elf_calories[i] = sum(elf_calories[i])
 
+if __name__ == "__main__":
+    elf_calories = load_elf_calories("data.txt")
+    assert top_k("data.txt", k=3) == (max(elf_calories),
+                                      sum(sorted(elf_calories)[-3:]))
+    assert top_k("data.txt", k=1) == (max(elf_calories), max(elf_calories))
+    # chunk count should never change the result
+    for n_workers in (1, 2, 3, 7, 64):
+        assert (parallel_top_k("data.txt", k=3, workers=n_workers)
+                == top_k("data.txt", k=3))
+    # neither should the block size of the numpy engine
+    for block_size in (1, 100, 1 << 22):
+        assert (numpy_top_k("data.txt", k=3, block_size=block_size)
+                == top_k("data.txt", k=3))
 
-# output target of exercise part 1
-max_calories = max(elf_calories)
-print("answer part 1")
-print(max_calories)
+    # feed the data to a growing file in pieces, also cutting lines in half
+    with open("data.txt", "rb") as fhandle:
+        raw_data = fhandle.read()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "log.txt")
+        open(log_path, "wb").close()
+        for start in range(0, len(raw_data), 997):
+            with open(log_path, "ab") as fhandle:
+                fhandle.write(raw_data[start:start + 997])
+            assert incremental_top_k(log_path, k=3) == top_k(log_path, k=3)
 
-print("answer part 2")
-sorted_elf_calories = sorted(elf_calories)
-print(sum(sorted_elf_calories[-3:]))
+    main()
@@ -1,19 +1,16 @@
 import rps_module
-import numpy
 
-# load data
-data = numpy.genfromtxt("data.txt", delimiter=" ", dtype=str)
+# load data as counts of the 9 possible (oponent, me) pairs
+histogram = rps_module.pair_histogram("data.txt")
 
 # calculate score
-scores = [rps_module.round_score_calculator(a, b)
-          for (a, b) in data]
+score = rps_module.score_pair_histogram(histogram, rps_module.ROUND_SCORE_TABLE)
 
 # print answer
 print("part 1:")
-print(sum(scores))
+print(score)
 
 # calculate score
-scores = [rps_module.strategy_score_calculator(a, b)
-          for (a, b) in data]
+score = rps_module.score_pair_histogram(histogram, rps_module.STRATEGY_SCORE_TABLE)
 print("part 2:")
-print(sum(scores))
\ No newline at end of file
+print(score)
@@ -1,3 +1,9 @@
+import itertools
+import os
+import tempfile
+
+import numpy
+
 # simple datastructure like map of scores and basis vectors
 # rock      = (1, 0, 0)  (play score = 1)
 # paper     = (0, 1, 0)  (play score = 2)
@@ -171,6 +177,269 @@ def strategy_score_calculator(oponent_input, my_input) -> int:
     play_score = play_idx + 1
     return game_score + play_score
 
+
+# precomputed 3x3 score tables, indexed by [oponent_idx, my_idx]
+# where the index of a key is its offset from the first key ("A" or "X").
+# Built from the scalar functions above, so both always agree.
+ROUND_SCORE_TABLE = numpy.array(
+    [[round_score_calculator(a, b) for b in RPS_LUT] for a in OPONENT_LUT],
+    dtype=numpy.int64)
+
+STRATEGY_SCORE_TABLE = numpy.array(
+    [[strategy_score_calculator(a, b) for b in STRATEGY_LUT] for a in OPONENT_LUT],
+    dtype=numpy.int64)
+
+
+def __codes_to_indices(codes, first_code: str) -> numpy.ndarray:
+    """Convert an array of single letter codes to table indices 0, 1, 2
+
+    Accepts unicode arrays (as produced by numpy.genfromtxt(..., dtype=str)),
+    byte string arrays, or arrays that already hold integer indices.
+
+    arguments:
+        codes (array like): codes such as "A", "B", "C"
+        first_code (str): code that maps to index 0
+    returns:
+        indices (numpy.ndarray)
+    """
+    codes = numpy.asarray(codes)
+    if codes.dtype.kind in "US" and codes.size and numpy.any(numpy.char.str_len(codes) != 1):
+        raise ValueError("Invalid code in input, every code should be a single letter")
+    if codes.dtype.kind == "U":
+        indices = codes.astype("<U1").view(numpy.uint32).astype(numpy.int64)
+        indices -= ord(first_code)
+    elif codes.dtype.kind == "S":
+        indices = codes.astype("S1").view(numpy.uint8).astype(numpy.int64)
+        indices -= ord(first_code)
+    else:
+        indices = codes.astype(numpy.int64)
+    if indices.size and (indices.min() < 0 or indices.max() > 2):
+        raise ValueError("Invalid code in input, expected one of"
+                         f" {first_code}{chr(ord(first_code) + 1)}"
+                         f"{chr(ord(first_code) + 2)} or 0, 1, 2")
+    return indices
+
+
+def batch_round_score_calculator(oponent_inputs, my_inputs) -> int:
+    """Total score of many rounds at once (part 1)
+
+    Vectorized version of round_score_calculator, which stays as the
+    reference implementation. Scores are looked up in ROUND_SCORE_TABLE
+    by array indexing, so there are no per-round python calls.
+
+    arguments:
+        oponent_inputs (array like): 'A', 'B', or 'C' per round
+        my_inputs (array like): 'X', 'Y', or 'Z' per round
+    returns:
+        total_score (int)
+    """
+    oponent_idx = __codes_to_indices(oponent_inputs, "A")
+    my_idx = __codes_to_indices(my_inputs, "X")
+    return int(ROUND_SCORE_TABLE[oponent_idx, my_idx].sum())
+
+
+def batch_strategy_score_calculator(oponent_inputs, my_inputs) -> int:
+    """Total score of many rounds at once following the strategy guide (part 2)
+
+    Vectorized version of strategy_score_calculator, which stays as the
+    reference implementation.
+
+    arguments:
+        oponent_inputs (array like): 'A', 'B', or 'C' per round
+        my_inputs (array like): 'X', 'Y', or 'Z' per round
+    returns:
+        total_score (int)
+    """
+    oponent_idx = __codes_to_indices(oponent_inputs, "A")
+    my_idx = __codes_to_indices(my_inputs, "X")
+    return int(STRATEGY_SCORE_TABLE[oponent_idx, my_idx].sum())
+
+
+def __next_line_start(buf: numpy.ndarray, position: int, window: int = 4096) -> int:
+    """Return the first offset >= position at which a line starts"""
+    if position == 0 or buf[position - 1] == ord("\n"):
+        return position
+    while position < len(buf):
+        hits = numpy.flatnonzero(buf[position:position + window] == ord("\n"))
+        if len(hits):
+            return position + int(hits[0]) + 1
+        position += window
+    return len(buf)
+
+
+def __encode_lines(block: numpy.ndarray, first_line: int, path) -> numpy.ndarray:
+    """Pair index of every line "A Y" of a block of whole lines
+
+    The oponent code is the byte at the line start and my code the byte
+    two further, every other line has to be empty.
+
+    arguments:
+        block (numpy.ndarray): uint8 bytes, starting at a line start
+        first_line (int): line number of the first line, for errors
+        path (os.PathLike): path to strategy guide, for errors
+    returns:
+        pairs (numpy.ndarray): 3 * oponent_idx + my_idx per non empty line
+    """
+    newlines = numpy.flatnonzero(block == ord("\n"))
+    starts = numpy.concatenate(([0], newlines + 1))
+    ends = numpy.concatenate((newlines, [len(block)]))
+    lengths = ends - starts
+    # allow windows line endings
+    last = block[numpy.maximum(ends - 1, 0)] if len(block) else ends
+    lengths -= (lengths > 0) & (last == ord("\r"))
+    starts = starts[lengths > 0]
+    line_numbers = numpy.flatnonzero(lengths > 0) + first_line
+    lengths = lengths[lengths > 0]
+    safe = len(block) - 1
+    oponent = block[numpy.minimum(starts, safe)].astype(numpy.int64) - ord("A")
+    space = block[numpy.minimum(starts + 1, safe)]
+    me = block[numpy.minimum(starts + 2, safe)].astype(numpy.int64) - ord("X")
+    valid = ((lengths == 3) & (space == ord(" "))
+             & (oponent >= 0) & (oponent <= 2) & (me >= 0) & (me <= 2))
+    if not valid.all():
+        line_number = int(line_numbers[numpy.argmin(valid)])
+        raise ValueError(f"Malformed strategy guide {path}: line {line_number}"
+                         " does not look like '[ABC] [XYZ]'")
+    return 3 * oponent + me
+
+
+def pair_histogram(path, block_size: int = 1 << 24) -> numpy.ndarray:
+    """Count how often each of the 9 (oponent, me) pairs occurs in a guide
+
+    Reads the raw bytes through a memory map instead of building a
+    unicode array with numpy.genfromtxt. Every line is encoded as pair
+    index 3 * oponent_idx + my_idx, which is the index into
+    ROUND_SCORE_TABLE.ravel() and friends. Lines that do not look like
+    "A Y" raise a ValueError, empty lines are skipped.
+
+    arguments:
+        path (os.PathLike): path to strategy guide
+        block_size (int): approximate number of bytes handled at once
+    returns:
+        histogram (numpy.ndarray): int64 counts of length 9
+    """
+    histogram = numpy.zeros(9, dtype=numpy.int64)
+    if os.path.getsize(path) == 0:
+        return histogram
+    buf = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    start = 0
+    first_line = 1
+    while start < len(buf):
+        end = __next_line_start(buf, min(start + block_size, len(buf)))
+        block = buf[start:end]
+        start = end
+        pairs = __encode_lines(block, first_line, path)
+        first_line += int(numpy.count_nonzero(block == ord("\n")))
+        histogram += numpy.bincount(pairs, minlength=9)
+    return histogram
+
+
+def load_pair_histogram(path, cache_path=None) -> numpy.ndarray:
+    """pair_histogram, cached on disk next to the input
+
+    Next to the cache a key file stores the size and modification time
+    of the input, like the task snapshots of day 4. The cache is only
+    used when both still match exactly and it can be read, otherwise
+    the histogram is computed again. The cache is written to a temporary
+    file first and then moved into place.
+
+    arguments:
+        path (os.PathLike): path to strategy guide
+        cache_path (os.PathLike): defaults to path + ".pairs.npy", the
+            key is stored in cache_path + ".key"
+    returns:
+        histogram (numpy.ndarray): int64 counts of length 9
+    """
+    if cache_path is None:
+        cache_path = f"{path}.pairs.npy"
+    key_path = f"{cache_path}.key"
+    stat = os.stat(path)
+    key = f"{stat.st_size} {stat.st_mtime_ns}"
+    if os.path.exists(cache_path) and os.path.exists(key_path):
+        with open(key_path, "r") as fhandle:
+            matches = fhandle.read().strip() == key
+        try:
+            cached = numpy.load(cache_path) if matches else None
+        except (OSError, ValueError):
+            cached = None
+        if cached is not None and cached.shape == (9,):
+            return cached
+    histogram = pair_histogram(path)
+    # drop the old key first, so the new cache is never paired with it
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".npy", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fhandle:
+            numpy.save(fhandle, histogram)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    with open(key_path, "w") as fhandle:
+        fhandle.write(key)
+    return histogram
+
+
+def score_pair_histogram(histogram: numpy.ndarray, score_table: numpy.ndarray) -> int:
+    """Total score of a pair histogram under a 3x3 score table
+
+    arguments:
+        histogram (numpy.ndarray): counts of length 9, see pair_histogram
+        score_table (numpy.ndarray): e.g. ROUND_SCORE_TABLE (part 1)
+            or STRATEGY_SCORE_TABLE (part 2)
+    returns:
+        total_score (int)
+    """
+    return int(numpy.dot(histogram, numpy.asarray(score_table).ravel()))
+
+
+def all_code_mappings() -> list[dict[str, str]]:
+    """All 27 ways to read the X/Y/Z column
+
+    Each mapping sends my code to the key it should be scored as, so
+    {"X": "Y", "Y": "Z", "Z": "X"} scores an X as if it were a Y. Keys of
+    RPS_LUT and STRATEGY_LUT are both X/Y/Z, so the same mappings serve as
+    move mappings (part 1) and outcome mappings (part 2). Mappings need
+    not be one to one.
+    """
+    codes = tuple(RPS_LUT)
+    return [dict(zip(codes, targets))
+            for targets in itertools.product(codes, repeat=len(codes))]
+
+
+def sweep_mappings(histogram: numpy.ndarray,
+                   mappings: list[dict[str, str]],
+                   score_table: numpy.ndarray = ROUND_SCORE_TABLE,
+                   ) -> list[tuple[dict[str, str], int]]:
+    """Score many interpretations of the X/Y/Z column at once
+
+    A candidates x 9 score matrix is built by picking the columns of
+    score_table each mapping points to, after which all candidates are
+    scored against the pair counts in one matrix-vector product.
+
+    arguments:
+        histogram (numpy.ndarray): counts of length 9, see pair_histogram
+        mappings (list[dict[str, str]]): e.g. all_code_mappings()
+        score_table (numpy.ndarray): ROUND_SCORE_TABLE to read the codes as
+            moves (part 1), STRATEGY_SCORE_TABLE to read them as outcomes
+            (part 2)
+    returns:
+        ranking (list[tuple[dict, int]]): (mapping, total score) pairs,
+            highest score first
+    """
+    codes = tuple(RPS_LUT)
+    columns = __codes_to_indices(
+        [[mapping[code] for code in codes] for mapping in mappings], codes[0])
+    columns = columns.reshape(len(mappings), len(codes))
+    # score_table[:, columns] has shape (3, candidates, 3): oponent, candidate, me
+    score_matrix = numpy.asarray(score_table)[:, columns].transpose(1, 0, 2)
+    score_matrix = score_matrix.reshape(len(mappings), 9)
+    scores = score_matrix @ numpy.asarray(histogram)
+    order = numpy.argsort(-scores, kind="stable")
+    return [(mappings[i], int(scores[i])) for i in order]
+
 if __name__ == "__main__":
     # game score tests
     assert __calc_round_outcome((1, 0, 0), (0, 1, 0)) == 2
@@ -193,4 +462,75 @@ if __name__ == "__main__":
     # aoc2022 example 2
     assert strategy_score_calculator("A", "Y") == 4
     assert strategy_score_calculator("B", "X") == 1
-    assert strategy_score_calculator("C", "Z") == 7
\ No newline at end of file
+    assert strategy_score_calculator("C", "Z") == 7
+
+    # batch versions agree with the scalar reference for all 9 pairs
+    for a in OPONENT_LUT:
+        for b in RPS_LUT:
+            assert batch_round_score_calculator([a], [b]) == round_score_calculator(a, b)
+            assert batch_strategy_score_calculator([a], [b]) == strategy_score_calculator(a, b)
+    assert batch_round_score_calculator(["A", "B", "C"], ["Y", "X", "Z"]) == 15
+    assert batch_strategy_score_calculator(["A", "B", "C"], ["Y", "X", "Z"]) == 12
+    assert batch_round_score_calculator([0, 1, 2], [1, 0, 2]) == 15
+    for oponent_inputs, my_inputs in ((["AB", "C"], ["X", "Y"]), (["A", ""], ["X", "Y"]),
+                                      ([b"A", b"B"], [b"XZ", b"Y"])):
+        try:
+            batch_round_score_calculator(oponent_inputs, my_inputs)
+            raise AssertionError("codes of more than one letter should raise")
+        except ValueError:
+            pass
+
+    # histogram scoring agrees with the per round scoring
+    data = numpy.genfromtxt("data.txt", delimiter=" ", dtype=str)
+    histogram = pair_histogram("data.txt")
+    assert histogram.sum() == len(data)
+    assert pair_histogram("data.txt", block_size=5).tolist() == histogram.tolist()
+    # rounds are read per line, malformed lines raise
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        guide_path = os.path.join(tmp_dir, "guide.txt")
+        for content, expected in ((b"A Y\nB X\r\n\nC Z", [0, 1, 0, 1, 0, 0, 0, 0, 1]),
+                                  (b"A Y\nC Z\n\n", [0, 1, 0, 0, 0, 0, 0, 0, 1]),
+                                  (b"Y A\nB X\n", None), (b"A\nY B\nX\n", None),
+                                  (b"A Y\nB  X\n", None), (b"A Y\nBX\n", None)):
+            with open(guide_path, "wb") as fhandle:
+                fhandle.write(content)
+            for block_size in (1, 4, 1 << 24):
+                try:
+                    assert pair_histogram(guide_path, block_size).tolist() == expected
+                except ValueError:
+                    assert expected is None
+
+        # the cache is used for the exact same input only, and a
+        # truncated cache is computed again
+        cache_path = os.path.join(tmp_dir, "guide.pairs.npy")
+        with open(guide_path, "wb") as fhandle:
+            fhandle.write(b"A Y\nB X\n")
+        assert load_pair_histogram(guide_path, cache_path).tolist() == [0, 1, 0, 1, 0, 0, 0, 0, 0]
+        assert load_pair_histogram(guide_path, cache_path).tolist() == [0, 1, 0, 1, 0, 0, 0, 0, 0]
+        old_mtime_ns = os.stat(guide_path).st_mtime_ns - 10 ** 9
+        with open(guide_path, "wb") as fhandle:
+            fhandle.write(b"C Z\nC Z\n")
+        os.utime(guide_path, ns=(old_mtime_ns, old_mtime_ns))
+        assert load_pair_histogram(guide_path, cache_path).tolist() == [0, 0, 0, 0, 0, 0, 0, 0, 2]
+        with open(cache_path, "r+b") as fhandle:
+            fhandle.truncate(10)
+        assert load_pair_histogram(guide_path, cache_path).tolist() == [0, 0, 0, 0, 0, 0, 0, 0, 2]
+        assert load_pair_histogram(guide_path, cache_path).tolist() == [0, 0, 0, 0, 0, 0, 0, 0, 2]
+    assert (score_pair_histogram(histogram, ROUND_SCORE_TABLE)
+            == sum(round_score_calculator(a, b) for a, b in data))
+    assert (score_pair_histogram(histogram, STRATEGY_SCORE_TABLE)
+            == sum(strategy_score_calculator(a, b) for a, b in data))
+
+    # sweeping the identity mapping reproduces the plain scores
+    identity = {"X": "X", "Y": "Y", "Z": "Z"}
+    assert len(all_code_mappings()) == 27
+    assert identity in all_code_mappings()
+    for score_table in (ROUND_SCORE_TABLE, STRATEGY_SCORE_TABLE):
+        ranking = sweep_mappings(histogram, all_code_mappings(), score_table)
+        identity_score = next(v for m, v in ranking if m == identity)
+        assert identity_score == score_pair_histogram(histogram, score_table)
+        assert [v for _, v in ranking] == sorted((v for _, v in ranking), reverse=True)
+    # and any mapping matches remapping the codes by hand
+    mapping = {"X": "Z", "Y": "X", "Z": "X"}
+    (_, score), = sweep_mappings(histogram, [mapping])
+    assert score == sum(round_score_calculator(a, mapping[b]) for a, b in data)
\ No newline at end of file
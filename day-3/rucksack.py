@@ -1,3 +1,15 @@
+import collections
+import concurrent.futures
+import functools
+import operator
+import os
+import string
+import tempfile
+import typing
+
+import numpy
+
+
 def __compartmentalise_input_string(input_string: str) -> tuple[str, 2]:
     """Returns compartment substrings for a given input string
 
@@ -93,9 +105,9 @@ def __count_rucksack_hash_elf_occurences(__rucksack_hash: dict[str: int]):
 count_rucksack_hash_occurences = __count_rucksack_hash_elf_occurences
 
 
-def __get_badge(rucksack_hash: dict[str: int]) -> str:
+def __get_badge(rucksack_hash: dict[str: int], group_size: int=3) -> str:
     for char, num_elfs in rucksack_hash.items():
-        if num_elfs == 3:
+        if num_elfs == group_size:
             return char
 
 
@@ -105,25 +117,406 @@ def __split_to_groups(rucksack_strings: tuple[str], group_size: int=3) -> tuple[
                  for i in range(0, len(rucksack_strings), group_size))
 
 
-def __find_badge_chars(rucksack_strings: tuple[str]) -> tuple[str]:
-    """find which items occur three times
+def __find_badge_chars(rucksack_strings: tuple[str], group_size: int=3) -> tuple[str]:
+    """find which items occur group_size (default three) times
 
     """
-    groups = __split_to_groups(rucksack_strings)
+    groups = __split_to_groups(rucksack_strings, group_size)
     badges = []
     for group in groups:
         group_hash = __hash_rucksack_contents_by_item(group)
         counted_rucksack_hash = __count_rucksack_hash_elf_occurences(group_hash)
-        badges.append(__get_badge(counted_rucksack_hash))
+        badges.append(__get_badge(counted_rucksack_hash, group_size))
     return badges
 
-def find_badge_values(rucksack_strings: tuple[str]) -> tuple[int]:
-    """find which items occur three times
+def find_badge_values(rucksack_strings: tuple[str], group_size: int=3) -> tuple[int]:
+    """find which items occur group_size (default three) times
 
     """
-    badges = __find_badge_chars(rucksack_strings)
+    badges = __find_badge_chars(rucksack_strings, group_size)
     return tuple(__value_of_char(badge) for badge in badges)
 
+
+# bit (value - 1) is set for each item, so a rucksack fits in a 52-bit int
+ITEM_BIT_LUT = {char: 1 << (__value_of_char(char) - 1)
+                for char in string.ascii_letters}
+
+
+def __item_mask(items: str) -> int:
+    """Return the bitmask of all items in a string"""
+    return functools.reduce(operator.or_, map(ITEM_BIT_LUT.__getitem__, items), 0)
+
+
+def __value_of_mask(mask: int) -> int:
+    """Return the AOC value of the lowest item in a mask
+
+    Since item value v lives at bit v - 1, the value is just the
+    bit length of the lowest set bit.
+    """
+    if mask == 0:
+        raise RuntimeError("No common item found")
+    return (mask & -mask).bit_length()
+
+
+def bitmask_common_character_values(rucksack_strings: tuple[str]) -> tuple[int]:
+    """Bitmask version of find_common_character_value for many rucksacks
+
+    Each compartment is turned into a 52-bit mask, so the common item is
+    a single AND. Assumes exactly one common item per rucksack, as the
+    puzzle guarantees.
+
+    arguments:
+        rucksack_strings (tuple[str]): full strings of rucksack contents
+    returns:
+        common item values (tuple[int])
+    """
+    values = []
+    for rucksack_str in rucksack_strings:
+        compartment_1, compartment_2 = __compartmentalise_input_string(rucksack_str)
+        values.append(__value_of_mask(__item_mask(compartment_1)
+                                      & __item_mask(compartment_2)))
+    return tuple(values)
+
+
+def bitmask_badge_values(rucksack_strings: tuple[str], group_size: int=3) -> tuple[int]:
+    """Bitmask version of find_badge_values
+
+    The badge is the single item in the AND of all rucksack masks
+    of a group.
+
+    arguments:
+        rucksack_strings (tuple[str]): full strings of rucksack contents
+        group_size (int): number of elves per group
+    returns:
+        badge values (tuple[int])
+    """
+    return tuple(__value_of_mask(functools.reduce(operator.and_, map(__item_mask, group)))
+                 for group in __split_to_groups(rucksack_strings, group_size))
+
+
+# maps every byte to its AOC value, 0 for anything that is not an item
+PRIORITY_LUT = numpy.zeros(256, dtype=numpy.uint8)
+for char in string.ascii_letters:
+    PRIORITY_LUT[ord(char)] = __value_of_char(char)
+del char
+
+NEWLINE = ord("\n")
+
+
+def __next_line_start(buf: numpy.ndarray, position: int, window: int = 4096) -> int:
+    """Return the first offset >= position at which a line starts"""
+    if position == 0 or buf[position - 1] == NEWLINE:
+        return position
+    while position < len(buf):
+        hits = numpy.flatnonzero(buf[position:position + window] == NEWLINE)
+        if len(hits):
+            return position + int(hits[0]) + 1
+        position += window
+    return len(buf)
+
+
+def __presence_matrix(block: numpy.ndarray) -> numpy.ndarray:
+    """Build the item presence matrix of a block of whole lines
+
+    Every item byte is assigned to its line and to the first or second
+    half of that line by comparing its index among the items of the line
+    with half the number of items. Empty lines are skipped.
+
+    arguments:
+        block (numpy.ndarray): uint8 bytes, starting at a line start
+    returns:
+        presence (numpy.ndarray): bool array of shape (lines, 2, 53), where
+            presence[line, compartment, value] is True if the item is there
+    """
+    line_ends = numpy.flatnonzero(block == NEWLINE)
+    if len(line_ends) == 0 or line_ends[-1] != len(block) - 1:
+        line_ends = numpy.append(line_ends, len(block) - 1)
+    line_starts = numpy.concatenate(([0], line_ends[:-1] + 1))
+    line_of_byte = numpy.repeat(numpy.arange(len(line_ends)),
+                                line_ends - line_starts + 1)
+
+    priorities = PRIORITY_LUT[block]
+    is_item = priorities > 0
+    item_count = numpy.cumsum(is_item)
+    items_before_line = item_count[line_starts] - is_item[line_starts]
+    items_per_line = item_count[line_ends] - items_before_line
+    if numpy.any(items_per_line % 2):
+        raise RuntimeError("Input string must be of even length"
+                           " but you provided an odd length string")
+
+    item_idx = item_count - 1 - items_before_line[line_of_byte]
+    compartment = item_idx >= (items_per_line // 2)[line_of_byte]
+    presence = numpy.zeros((len(line_ends), 2, 53), dtype=bool)
+    presence[line_of_byte[is_item], compartment[is_item].astype(numpy.intp),
+             priorities[is_item]] = True
+    return presence[items_per_line > 0]
+
+
+def __value_of_presence(presence: numpy.ndarray) -> numpy.ndarray:
+    """Return the value of the (lowest) item present in each row"""
+    if not numpy.all(presence.any(axis=1)):
+        raise RuntimeError("No common item found")
+    return presence.argmax(axis=1)
+
+
+def numpy_rucksack_values(path, group_size: int=3,
+                          block_size: int=1 << 22) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Vectorized common item and badge values straight from a file
+
+    The file is memory-mapped and read in blocks of whole lines. Bytes
+    map to values through PRIORITY_LUT, the common item of a rucksack
+    is the AND of the presence rows of both compartments, and the badge
+    of a group the AND over the rucksack rows of the group. Rucksacks of
+    a group that is cut by a block boundary are carried to the next block.
+    Assumes exactly one common item and badge, as the puzzle guarantees.
+
+    arguments:
+        path (os.PathLike): path to rucksack list
+        group_size (int): number of elves per group
+        block_size (int): approximate number of bytes handled at once
+    returns:
+        common item values (numpy.ndarray): one per rucksack (part 1)
+        badge values (numpy.ndarray): one per group (part 2)
+    """
+    common_values = [numpy.zeros(0, dtype=numpy.intp)]
+    badge_values = [numpy.zeros(0, dtype=numpy.intp)]
+    if os.path.getsize(path) == 0:
+        return common_values[0], badge_values[0]
+    buf = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    carry = numpy.zeros((0, 53), dtype=bool)
+    start = 0
+    while start < len(buf):
+        end = __next_line_start(buf, min(start + block_size, len(buf)))
+        presence = __presence_matrix(buf[start:end])
+        start = end
+
+        common_values.append(__value_of_presence(presence[:, 0] & presence[:, 1]))
+        rucksacks = numpy.concatenate((carry, presence[:, 0] | presence[:, 1]))
+        n_complete = len(rucksacks) - len(rucksacks) % group_size
+        carry = rucksacks[n_complete:]
+        groups = rucksacks[:n_complete].reshape(-1, group_size, 53)
+        badge_values.append(__value_of_presence(groups.all(axis=1)))
+    if len(carry):
+        raise RuntimeError(f"Number of rucksacks is not a multiple of {group_size}")
+    return numpy.concatenate(common_values), numpy.concatenate(badge_values)
+
+
+def __read_rucksacks(path) -> typing.Iterator[str]:
+    """Lazily yield the stripped, non-empty lines of a rucksack list"""
+    with open(path, "r") as fhandle:
+        for raw_line in fhandle:
+            line = raw_line.strip()
+            if line != "":
+                yield line
+
+
+def __batch_groups(rucksack_strings: typing.Iterable[str], group_size: int,
+                   batch_size: int) -> typing.Iterator[list[str]]:
+    """Yield batches of batch_size complete groups, formed on the fly
+
+    A batch is a flat list of rucksacks whose length is a multiple of
+    group_size, so it can be handed to find_badge_values as is.
+    """
+    batch = []
+    for rucksack_str in rucksack_strings:
+        batch.append(rucksack_str)
+        if len(batch) == group_size * batch_size:
+            yield batch
+            batch = []
+    if len(batch) % group_size != 0:
+        raise RuntimeError(f"Number of rucksacks is not a multiple of {group_size}")
+    if batch:
+        yield batch
+
+
+def __score_batch(batch: list[str], group_size: int) -> tuple[int, int]:
+    """Part 1 and part 2 totals of one batch of groups"""
+    common_total = sum(find_common_character_value(rucksack_str)
+                       for rucksack_str in batch)
+    badge_total = sum(find_badge_values(batch, group_size))
+    return common_total, badge_total
+
+
+def stream_rucksack_totals(path, group_size: int=3, batch_size: int=1024,
+                           workers: int=None) -> tuple[int, int]:
+    """Part 1 and part 2 totals in a single streaming pass over a file
+
+    Lines are read lazily and formed into groups on the fly. Batches of
+    batch_size groups are scored by a process pool with the reference
+    find_common_character_value and find_badge_values. At most two
+    batches per worker are in flight, so memory is bounded by the batch
+    size rather than by the input size.
+
+    arguments:
+        path (os.PathLike): path to rucksack list
+        group_size (int): number of elves per group
+        batch_size (int): number of groups sent to a worker at once
+        workers (int): number of processes, defaults to os.cpu_count()
+    returns:
+        common item total (int): part 1 answer
+        badge total (int): part 2 answer
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = __batch_groups(__read_rucksacks(path), group_size, batch_size)
+    common_total = 0
+    badge_total = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.submit(__score_batch, batch, group_size))
+            if len(pending) >= 2 * workers:
+                batch_common, batch_badge = pending.popleft().result()
+                common_total += batch_common
+                badge_total += batch_badge
+        for future in pending:
+            batch_common, batch_badge = future.result()
+            common_total += batch_common
+            badge_total += batch_badge
+    return common_total, badge_total
+
+
+class RucksackIndex(object):
+    """Inverted index from item to the set of rucksacks holding it
+
+    Every set is a python int used as a bitset, in which bit i is set
+    if rucksack i (counting non-empty lines from 0) holds the item. All
+    queries are bitwise operations on these ints, so they cost time
+    proportional to the bitset size, not to the size of the input text.
+    Build one with index_rucksacks or index_rucksack_file.
+
+    The bitsets are dense, not run-length or roaring compressed. With 52
+    items and a few dozen characters per rucksack, every item is in a
+    large fraction of the rucksacks, so the bitsets have no long runs or
+    empty blocks to compress away, and bitwise operations on plain ints
+    run in C. Only the saved .npz file is compressed.
+    """
+
+    def __init__(self, bitsets: dict[str, int], n_rucksacks: int):
+        self.bitsets = bitsets
+        self.n_rucksacks = n_rucksacks
+
+    @staticmethod
+    def __bitset_from_bools(flags: numpy.ndarray) -> int:
+        """Pack a bool array into an int, bit i set if flags[i] is True"""
+        return int.from_bytes(numpy.packbits(flags, bitorder="little").tobytes(), "little")
+
+    @staticmethod
+    def __bools_from_bitset(bitset: int, n_bits: int) -> numpy.ndarray:
+        """Inverse of __bitset_from_bools"""
+        packed = numpy.frombuffer(bitset.to_bytes((n_bits + 7) // 8, "little"),
+                                  dtype=numpy.uint8)
+        return numpy.unpackbits(packed, count=n_bits, bitorder="little").astype(bool)
+
+    @classmethod
+    def from_presence(cls, rucksacks: numpy.ndarray):
+        """Build the index from a (rucksacks, 53) presence matrix"""
+        bitsets = {char: cls.__bitset_from_bools(rucksacks[:, PRIORITY_LUT[ord(char)]])
+                   for char in string.ascii_letters}
+        return cls(bitsets, len(rucksacks))
+
+    def extend(self, other) -> None:
+        """Append the rucksacks of another index, in place"""
+        for char, bitset in other.bitsets.items():
+            self.bitsets[char] |= bitset << self.n_rucksacks
+        self.n_rucksacks += other.n_rucksacks
+
+    def save(self, path) -> None:
+        """Save the index as a compressed .npz file"""
+        n_bytes = (self.n_rucksacks + 7) // 8
+        packed = numpy.array([numpy.frombuffer(self.bitsets[char].to_bytes(n_bytes, "little"),
+                                               dtype=numpy.uint8)
+                              for char in string.ascii_letters]).reshape(52, n_bytes)
+        numpy.savez_compressed(path, n_rucksacks=self.n_rucksacks, bitsets=packed)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with save"""
+        with numpy.load(path) as archive:
+            n_rucksacks = int(archive["n_rucksacks"])
+            bitsets = {char: int.from_bytes(row.tobytes(), "little")
+                       for char, row in zip(string.ascii_letters, archive["bitsets"])}
+        return cls(bitsets, n_rucksacks)
+
+    def count(self, item: str) -> int:
+        """Number of rucksacks holding item"""
+        return self.bitsets[item].bit_count()
+
+    def intersection(self, *items: str) -> int:
+        """Bitset of the rucksacks holding all items"""
+        bitset = (1 << self.n_rucksacks) - 1
+        for item in items:
+            bitset &= self.bitsets[item]
+        return bitset
+
+    def rucksacks_with(self, *items: str) -> numpy.ndarray:
+        """Ids of the rucksacks holding all items"""
+        return numpy.flatnonzero(self.__bools_from_bitset(self.intersection(*items),
+                                                          self.n_rucksacks))
+
+    def common_items(self, rucksack_ids: typing.Iterable[int]) -> str:
+        """Items held by all of the given rucksacks, in order of value"""
+        mask = 0
+        for rucksack_id in rucksack_ids:
+            mask |= 1 << rucksack_id
+        return "".join(char for char in string.ascii_letters
+                       if self.bitsets[char] & mask == mask)
+
+    def groups_with(self, item: str, group_size: int=3) -> numpy.ndarray:
+        """Ids of the groups in which every rucksack holds item
+
+        Groups are consecutive runs of group_size rucksacks. Shifting the
+        bitset and AND-ing it with itself leaves bit i set if rucksacks
+        i ... i + group_size - 1 all hold the item; only the bits at the
+        start of a group are kept.
+        """
+        bitset = self.bitsets[item]
+        all_members = bitset
+        for shift in range(1, group_size):
+            all_members &= bitset >> shift
+        n_groups = self.n_rucksacks // group_size
+        flags = self.__bools_from_bitset(all_members, self.n_rucksacks)
+        return numpy.flatnonzero(flags[:n_groups * group_size:group_size])
+
+    def badge_values(self, group_size: int=3) -> tuple[int]:
+        """Badge value of every group, answered from the index
+
+        Same result as find_badge_values on the indexed rucksacks, assuming
+        a single badge per group as the puzzle guarantees. If a group shares
+        several items, the lowest value is returned.
+        """
+        if self.n_rucksacks % group_size != 0:
+            raise RuntimeError(f"Number of rucksacks is not a multiple of {group_size}")
+        badges = numpy.zeros(self.n_rucksacks // group_size, dtype=numpy.intp)
+        for char in reversed(string.ascii_letters):
+            badges[self.groups_with(char, group_size)] = PRIORITY_LUT[ord(char)]
+        if not numpy.all(badges):
+            raise RuntimeError("No common item found")
+        return tuple(int(badge) for badge in badges)
+
+
+def index_rucksacks(rucksack_strings: typing.Iterable[str]) -> RucksackIndex:
+    """Build a RucksackIndex from rucksack strings in memory"""
+    block = numpy.frombuffer("\n".join(rucksack_strings).encode("ascii"), dtype=numpy.uint8)
+    if len(block) == 0:
+        return RucksackIndex({char: 0 for char in string.ascii_letters}, 0)
+    presence = __presence_matrix(block)
+    return RucksackIndex.from_presence(presence[:, 0] | presence[:, 1])
+
+
+def index_rucksack_file(path, block_size: int=1 << 22) -> RucksackIndex:
+    """Build a RucksackIndex from a rucksack list, reading it in blocks"""
+    index = RucksackIndex({char: 0 for char in string.ascii_letters}, 0)
+    if os.path.getsize(path) == 0:
+        return index
+    buf = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    start = 0
+    while start < len(buf):
+        end = __next_line_start(buf, min(start + block_size, len(buf)))
+        presence = __presence_matrix(buf[start:end])
+        start = end
+        index.extend(RucksackIndex.from_presence(presence[:, 0] | presence[:, 1]))
+    return index
+
 if __name__ == "__main__":
     # test __compartmentalise_input_string
     assert __compartmentalise_input_string("aaaAAA") == ("aaa", "AAA")
@@ -178,4 +571,45 @@ if __name__ == "__main__":
     assert __find_badge_chars(test_1["input"])[0] == test_1["ans"]
     assert find_badge_values(test_1["input"])[0] == __value_of_char(test_1["ans"])
     assert __find_badge_chars(test_2["input"])[0] == test_2["ans"]
-    assert find_badge_values(test_2["input"])[0] == __value_of_char(test_2["ans"])
\ No newline at end of file
+    assert find_badge_values(test_2["input"])[0] == __value_of_char(test_2["ans"])
+
+    # bitmask engine agrees with the hash map engine
+    assert ITEM_BIT_LUT["a"] == 1 and ITEM_BIT_LUT["Z"] == 1 << 51
+    assert __value_of_mask(ITEM_BIT_LUT["A"]) == __value_of_char("A")
+    examples = test_1["input"] + test_2["input"]
+    assert bitmask_common_character_values(examples) == tuple(
+        find_common_character_value(rucksack_str) for rucksack_str in examples)
+    assert bitmask_badge_values(examples) == find_badge_values(examples)
+
+    # numpy engine agrees with the hash map engine on the full input,
+    # whatever the block size and group size
+    with open("data.txt", "r") as fhandle:
+        data = [l.strip() for l in fhandle.readlines()]
+    for block_size in (1, 1000, 1 << 22):
+        common_values, badge_values = numpy_rucksack_values("data.txt", block_size=block_size)
+        assert tuple(common_values) == tuple(find_common_character_value(l) for l in data)
+        assert tuple(badge_values) == find_badge_values(data)
+    _, badge_values = numpy_rucksack_values("data.txt", group_size=1)
+    assert tuple(badge_values) == bitmask_badge_values(data, group_size=1)
+
+    # streaming totals agree with the reference, whatever the batching
+    for batch_size, workers in ((1, 1), (7, 2), (1024, None)):
+        assert stream_rucksack_totals("data.txt", batch_size=batch_size, workers=workers) == (
+            sum(find_common_character_value(l) for l in data), sum(find_badge_values(data)))
+
+    # index queries agree with scanning the input
+    index = index_rucksack_file("data.txt", block_size=1000)
+    assert index.n_rucksacks == len(data)
+    assert index.badge_values() == find_badge_values(data)
+    assert index.badge_values(group_size=1) == bitmask_badge_values(data, group_size=1)
+    assert index.groups_with("r").tolist() == [g for g in range(len(data) // 3)
+                                               if all("r" in l for l in data[3 * g:3 * g + 3])]
+    assert index.count("a") == sum("a" in l for l in data)
+    assert index.rucksacks_with("a", "B").tolist() == [i for i, l in enumerate(data)
+                                                       if "a" in l and "B" in l]
+    assert index.common_items((0, 1, 2)) == __find_badge_chars(data[:3])[0]
+    index_from_strings = index_rucksacks(data)
+    assert index_from_strings.bitsets == index.bitsets
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(os.path.join(tmp_dir, "index.npz"))
+        assert RucksackIndex.load(os.path.join(tmp_dir, "index.npz")).bitsets == index.bitsets
\ No newline at end of file
@@ -7,10 +7,13 @@ main.py
 """
 
 import os.path
+import tempfile
 import typing
 
 import collections
 
+import numpy
+
 Task = collections.namedtuple("Task", ("low", "high"))
 TaskPair = collections.namedtuple("TaskPair", ("t1", "t2"))
 
@@ -56,11 +59,426 @@ def overlap(task_pair: TaskPair) -> bool:
     idx_low = not idx_high
     t_low = task_pair[idx_low]
     t_high = task_pair[idx_high]
-    print(t_low, t_high, t_low.high >= t_high.low)
     return t_low.high >= t_high.low
 
 
+SEPARATORS = bytes.maketrans(b",-", b"  ")
+# token codes of a valid line: number - number , number - number
+NUMBER, DASH, COMMA = 0, 1, 2
+LINE_TOKENS = numpy.array([NUMBER, DASH, NUMBER, COMMA, NUMBER, DASH, NUMBER])
+
+
+def __check_lines(raw_data: bytes) -> None:
+    """Raise a ValueError unless every non empty line looks like 2-4,6-8
+
+    The tokens of the whole input (number starts, dashes and commas) are
+    found at once and grouped per line, every line then needs exactly
+    the token sequence LINE_TOKENS. Other whitespace is allowed, as it
+    is by int() in parse_data.
+    """
+    data = numpy.frombuffer(raw_data, dtype=numpy.uint8)
+    digits = (data >= ord("0")) & (data <= ord("9"))
+    dashes = data == ord("-")
+    commas = data == ord(",")
+    newlines = data == ord("\n")
+    blanks = numpy.isin(data, numpy.frombuffer(b" \t\r", dtype=numpy.uint8))
+    line_ids = numpy.cumsum(newlines) - newlines
+    invalid = ~(digits | dashes | commas | newlines | blanks)
+    if invalid.any():
+        line_number = int(line_ids[numpy.argmax(invalid)]) + 1
+        raise ValueError(f"Unexpected character on line {line_number}")
+    number_starts = digits.copy()
+    number_starts[1:] &= ~digits[:-1]
+    is_token = number_starts | dashes | commas
+    tokens = numpy.where(dashes, DASH, numpy.where(commas, COMMA, NUMBER))[is_token]
+    token_lines = line_ids[is_token]
+    n_lines = int(line_ids[-1]) + 1 if len(data) else 0
+    tokens_per_line = numpy.bincount(token_lines, minlength=n_lines)
+    bad_lines = (tokens_per_line != 0) & (tokens_per_line != len(LINE_TOKENS))
+    if not bad_lines.any():
+        matches = (tokens.reshape(-1, len(LINE_TOKENS)) == LINE_TOKENS).all(axis=1)
+        bad_lines[numpy.flatnonzero(tokens_per_line)[~matches]] = True
+    if bad_lines.any():
+        line_number = int(numpy.argmax(bad_lines)) + 1
+        raise ValueError(f"Line {line_number} should hold two ranges like 2-4,6-8")
+
+
+def parse_array(lines: list[str]) -> numpy.ndarray:
+    """Parse lines into an N x 4 int array of (low1, high1, low2, high2)
+
+    Array counterpart of parse_data, for the vectorized kernels below.
+    """
+    return load_array_from_bytes("".join(lines).encode("ascii"))
+
+
+def load_array_from_bytes(raw_data: bytes) -> numpy.ndarray:
+    """Parse the raw bytes of a data file into an N x 4 int array
+
+    The line structure is checked with __check_lines first. Then the
+    separators are turned into spaces, so that all numbers can be split
+    off in one pass without going through lines. Empty lines are skipped.
+    """
+    __check_lines(raw_data)
+    numbers = raw_data.translate(SEPARATORS).split()
+    tasks = numpy.fromiter(map(int, numbers), dtype=numpy.int64, count=len(numbers))
+    return tasks.reshape(-1, 4)
+
+
+def load_array(path: os.PathLike) -> numpy.ndarray:
+    with open(path, "rb") as fhandle:
+        return load_array_from_bytes(fhandle.read())
+
+
+class TaskPairStore(object):
+    """Columnar storage of task pairs
+
+    Holds four contiguous int32 arrays (low1, high1, low2, high2) instead
+    of a list of TaskPair namedtuples, which takes 16 bytes per pair
+    instead of several hundred. Indexing and iteration still give
+    TaskPair objects, so it can stand in for the output of parse_data.
+
+    The store can be saved as a binary snapshot (a (4, N) int32 .npy file)
+    and loaded again through a memory map, skipping text parsing.
+    """
+
+    __slots__ = ("low1", "high1", "low2", "high2")
+
+    def __init__(self, low1, high1, low2, high2):
+        self.low1 = low1
+        self.high1 = high1
+        self.low2 = low2
+        self.high2 = high2
+
+    @classmethod
+    def from_array(cls, tasks: numpy.ndarray):
+        """Create a store from an N x 4 array as returned by load_array"""
+        tasks = numpy.asarray(tasks).reshape(-1, 4)
+        info = numpy.iinfo(numpy.int32)
+        if tasks.size and (tasks.min() < info.min or tasks.max() > info.max):
+            raise ValueError("Section ids do not fit in int32")
+        columns = numpy.ascontiguousarray(tasks.T, dtype=numpy.int32)
+        return cls(*columns)
+
+    @classmethod
+    def from_task_pairs(cls, parsed_data: list[TaskPair]):
+        """Create a store from the output of parse_data"""
+        return cls.from_array([[t1.low, t1.high, t2.low, t2.high]
+                               for t1, t2 in parsed_data])
+
+    @property
+    def columns(self) -> tuple[numpy.ndarray, ...]:
+        return self.low1, self.high1, self.low2, self.high2
+
+    def to_array(self) -> numpy.ndarray:
+        """Return the N x 4 array of (low1, high1, low2, high2)"""
+        return numpy.stack(self.columns, axis=1)
+
+    def __len__(self) -> int:
+        return len(self.low1)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self)(*(column[index] for column in self.columns))
+        return TaskPair(Task(int(self.low1[index]), int(self.high1[index])),
+                        Task(int(self.low2[index]), int(self.high2[index])))
+
+    def __iter__(self) -> typing.Iterator[TaskPair]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def save(self, path: os.PathLike) -> None:
+        """Write a binary snapshot of the store
+
+        The snapshot is written to a temporary file first and then moved
+        into place, so an interrupted save never leaves a truncated file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(suffix=".npy", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as fhandle:
+                numpy.save(fhandle, numpy.stack(self.columns).astype(numpy.int32))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: os.PathLike):
+        """Memory-map a binary snapshot written by save"""
+        return cls(*numpy.load(path, mmap_mode="r"))
+
+    def __repr__(self):
+        return f"TaskPairStore(n={len(self)})"
+
+
+def load_store(path: os.PathLike, snapshot_path: os.PathLike = None) -> TaskPairStore:
+    """Load task pairs as a TaskPairStore, using a snapshot when possible
+
+    Next to the snapshot a key file stores the size and modification time
+    of the text file it was made from. The snapshot is only used when
+    both still match exactly, otherwise the text file is parsed again.
+
+    arguments:
+        path (os.PathLike): path to data file
+        snapshot_path (os.PathLike): defaults to path + ".tasks.npy", the
+            key is stored in snapshot_path + ".key"
+    returns:
+        store (TaskPairStore)
+    """
+    if snapshot_path is None:
+        snapshot_path = f"{path}.tasks.npy"
+    key_path = f"{snapshot_path}.key"
+    stat = os.stat(path)
+    key = f"{stat.st_size} {stat.st_mtime_ns}"
+    if os.path.exists(snapshot_path) and os.path.exists(key_path):
+        with open(key_path, "r") as fhandle:
+            if fhandle.read().strip() == key:
+                return TaskPairStore.load(snapshot_path)
+    store = TaskPairStore.from_array(load_array(path))
+    # drop the old key first, so the new snapshot is never paired with it
+    if os.path.exists(key_path):
+        os.remove(key_path)
+    store.save(snapshot_path)
+    with open(key_path, "w") as fhandle:
+        fhandle.write(key)
+    return store
+
+
+def count_contained_and_overlapping(tasks: numpy.ndarray) -> tuple[int, int]:
+    """Vectorized fully_contained and overlap over all pairs at once
+
+    arguments:
+        tasks (numpy.ndarray | TaskPairStore): N x 4 array of
+            (low1, high1, low2, high2), or the same data as a store
+    returns:
+        num_fully_contained (int): part 1 answer
+        num_overlapping (int): part 2 answer
+    """
+    if isinstance(tasks, TaskPairStore):
+        low1, high1, low2, high2 = tasks.columns
+    else:
+        low1, high1, low2, high2 = numpy.asarray(tasks).T
+    t1_contains_t2 = (low1 >= low2) & (high1 <= high2)
+    t2_contains_t1 = (low1 <= low2) & (high1 >= high2)
+    # two ranges overlap iff each starts before the other ends
+    overlapping = (low1 <= high2) & (low2 <= high1)
+    return (int(numpy.count_nonzero(t1_contains_t2 | t2_contains_t1)),
+            int(numpy.count_nonzero(overlapping)))
+
+
+class TaskIndex(object):
+    """Sweep index over many Task ranges for all-pairs queries
+
+    Checking every pair of tasks with overlap/fully_contained is O(n^2).
+    Instead the lows and highs are kept sorted, so that the number of
+    tasks ending before (or starting after) any range is a binary search.
+    Two closed ranges do not overlap iff one ends before the other
+    starts, so all overlap questions follow from those two counts.
+    Containment is counted with a sweep over the tasks sorted by low,
+    keeping a Fenwick tree over the highs seen so far.
+    """
+
+    def __init__(self, lows, highs):
+        self.lows = numpy.asarray(lows, dtype=numpy.int64)
+        self.highs = numpy.asarray(highs, dtype=numpy.int64)
+        self.sorted_lows = numpy.sort(self.lows)
+        self.sorted_highs = numpy.sort(self.highs)
+
+    @classmethod
+    def from_tasks(cls, tasks: typing.Iterable[Task]):
+        tasks = list(tasks)
+        return cls([t.low for t in tasks], [t.high for t in tasks])
+
+    @classmethod
+    def from_task_pairs(cls, parsed_data):
+        """Index both tasks of every pair of parse_data or TaskPairStore output"""
+        return cls(*task_bounds(parsed_data))
+
+    def __len__(self) -> int:
+        return len(self.lows)
+
+    def __num_disjoint(self, lows, highs) -> numpy.ndarray:
+        """Number of indexed tasks that end before low or start after high"""
+        ending_before = numpy.searchsorted(self.sorted_highs, lows, side="left")
+        starting_after = len(self) - numpy.searchsorted(self.sorted_lows, highs, side="right")
+        return ending_before + starting_after
+
+    def overlap_count(self, task: Task) -> int:
+        """Number of indexed tasks overlapping task (itself included, if indexed)"""
+        return len(self) - int(self.__num_disjoint(task.low, task.high))
+
+    def overlap_counts(self) -> numpy.ndarray:
+        """For every indexed task, how many other tasks overlap it"""
+        return len(self) - 1 - self.__num_disjoint(self.lows, self.highs)
+
+    def count_overlapping_pairs(self) -> int:
+        """Number of unordered pairs of tasks that overlap"""
+        n = len(self)
+        # every disjoint pair has exactly one task that ends before the other starts
+        num_disjoint = int(numpy.searchsorted(self.sorted_highs, self.lows, side="left").sum())
+        return n * (n - 1) // 2 - num_disjoint
+
+    def __sweep_containers(self) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Count containers of every task among the tasks sorted before it
+
+        Tasks are sorted by low ascending, then high descending, so any
+        task that contains another one comes first. While sweeping, a
+        Fenwick tree counts the highs seen so far; the containers of a
+        task are the earlier tasks with a high at least as large.
+
+        returns:
+            order (numpy.ndarray): sweep order of the tasks
+            containers (numpy.ndarray): number of containing tasks before
+                each task in the sweep order
+        """
+        order = numpy.lexsort((-self.highs, self.lows))
+        unique_highs = numpy.unique(self.highs)
+        ranks = numpy.searchsorted(unique_highs, self.highs[order]) + 1
+        tree = [0] * (len(unique_highs) + 1)
+        containers = numpy.zeros(len(self), dtype=numpy.int64)
+        for seen, rank in enumerate(ranks.tolist()):
+            # number of seen highs strictly below this one
+            below = 0
+            i = rank - 1
+            while i > 0:
+                below += tree[i]
+                i -= i & -i
+            containers[seen] = seen - below
+            i = rank
+            while i < len(tree):
+                tree[i] += 1
+                i += i & -i
+        return order, containers
+
+    def count_containing_pairs(self) -> int:
+        """Number of unordered pairs of tasks of which one contains the other"""
+        _, containers = self.__sweep_containers()
+        return int(containers.sum())
+
+    def contained_by_counts(self) -> numpy.ndarray:
+        """For every indexed task, how many other tasks fully contain it"""
+        order, containers = self.__sweep_containers()
+        # identical tasks contain each other, but the sweep only sees the
+        # copies sorted before a task, so add the copies sorted after it
+        lows, highs = self.lows[order], self.highs[order]
+        new_run = numpy.ones(len(self), dtype=bool)
+        new_run[1:] = (lows[1:] != lows[:-1]) | (highs[1:] != highs[:-1])
+        run_starts = numpy.flatnonzero(new_run)
+        run_lengths = numpy.diff(numpy.append(run_starts, len(self)))
+        position_in_run = numpy.arange(len(self)) - numpy.repeat(run_starts, run_lengths)
+        copies_after = numpy.repeat(run_lengths, run_lengths) - 1 - position_in_run
+        counts = numpy.empty(len(self), dtype=numpy.int64)
+        counts[order] = containers + copies_after
+        return counts
+
+
+class SectionCoverage(object):
+    """Number of elves assigned to every section id
+
+    Coverage is stored run-length encoded: run i covers the sections
+    starts[i] ... starts[i + 1] - 1 (the last run ends before end) and
+    all of them are covered counts[i] times. Sections outside
+    [starts[0], end) are covered zero times.
+
+    It is built with a difference array: +1 at every low, -1 just after
+    every high, and a prefix sum over that. The dense mode does this for
+    every section id in between, O(n + range). The compressed mode only
+    keeps the ids where the coverage can change, O(n log n), which is
+    the one to use for sparse, very wide id spaces.
+    """
+
+    def __init__(self, starts: numpy.ndarray, counts: numpy.ndarray, end: int):
+        self.starts = starts
+        self.counts = counts
+        self.end = end
+
+    @classmethod
+    def from_tasks(cls, lows, highs, compressed: bool = None):
+        """Build the coverage of tasks low ... high (inclusive)
+
+        arguments:
+            lows, highs (array like): bounds of every task
+            compressed (bool): use coordinate compression, by default
+                only if the id range is wider than twice the number of tasks
+        """
+        lows = numpy.asarray(lows, dtype=numpy.int64)
+        highs = numpy.asarray(highs, dtype=numpy.int64)
+        if len(lows) == 0:
+            return cls(numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64), 0)
+        first, end = int(lows.min()), int(highs.max()) + 1
+        if compressed is None:
+            compressed = end - first > 2 * len(lows)
+        if compressed:
+            coordinates = numpy.unique(numpy.concatenate((lows, highs + 1)))
+            low_idx = numpy.searchsorted(coordinates, lows)
+            end_idx = numpy.searchsorted(coordinates, highs + 1)
+            starts = coordinates[:-1]
+        else:
+            low_idx = lows - first
+            end_idx = highs + 1 - first
+            starts = numpy.arange(first, end, dtype=numpy.int64)
+        size = len(starts) + 1
+        difference = (numpy.bincount(low_idx, minlength=size)
+                      - numpy.bincount(end_idx, minlength=size))
+        return cls(starts, numpy.cumsum(difference)[:-1], end)
+
+    @classmethod
+    def from_task_pairs(cls, parsed_data, compressed: bool = None):
+        """Coverage of both tasks of every pair of parse_data or TaskPairStore output"""
+        return cls.from_tasks(*task_bounds(parsed_data), compressed=compressed)
+
+    def __run_lengths(self) -> numpy.ndarray:
+        return numpy.diff(numpy.append(self.starts, self.end))
+
+    def histogram(self) -> tuple[int, numpy.ndarray]:
+        """Return the first section id and the coverage of every section from there on"""
+        if len(self.starts) == 0:
+            return 0, numpy.zeros(0, dtype=numpy.int64)
+        return int(self.starts[0]), numpy.repeat(self.counts, self.__run_lengths())
+
+    def max_concurrency(self) -> int:
+        """Highest number of elves assigned to a single section"""
+        if len(self.counts) == 0:
+            return 0
+        return int(self.counts.max())
+
+    def ranges_covered(self, k: int) -> numpy.ndarray:
+        """Sections covered exactly k times, as (first, last) rows of an M x 2 array"""
+        matches = self.counts == k
+        # neighbouring runs touch, so merge consecutive matches into one range
+        edges = numpy.diff(numpy.concatenate(([0], matches.astype(numpy.int8), [0])))
+        first_runs = numpy.flatnonzero(edges == 1)
+        last_runs = numpy.flatnonzero(edges == -1) - 1
+        ends = numpy.append(self.starts[1:], self.end)
+        return numpy.stack((self.starts[first_runs], ends[last_runs] - 1), axis=1)
+
+    def count_covered(self, k: int) -> int:
+        """Number of sections covered exactly k times"""
+        return int(self.__run_lengths()[self.counts == k].sum())
+
+
+def task_bounds(parsed_data) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Lows and highs of both tasks of every pair
+
+    arguments:
+        parsed_data (list[TaskPair] | TaskPairStore | numpy.ndarray)
+    returns:
+        lows, highs (numpy.ndarray): first tasks followed by second tasks
+    """
+    if isinstance(parsed_data, TaskPairStore):
+        low1, high1, low2, high2 = parsed_data.columns
+    elif isinstance(parsed_data, numpy.ndarray):
+        low1, high1, low2, high2 = parsed_data.T
+    else:
+        low1, high1, low2, high2 = numpy.array(
+            [[t1.low, t1.high, t2.low, t2.high] for t1, t2 in parsed_data],
+            dtype=numpy.int64).reshape(-1, 4).T
+    return numpy.concatenate((low1, low2)), numpy.concatenate((high1, high2))
+
+
 def part_1(parsed_data: list[TaskPair]) -> int:
+    if isinstance(parsed_data, (numpy.ndarray, TaskPairStore)):
+        return count_contained_and_overlapping(parsed_data)[0]
     num_fully_contained = sum(fully_contained(task_pair)
                               for task_pair in parsed_data
                               )
@@ -68,14 +486,107 @@ def part_1(parsed_data: list[TaskPair]) -> int:
 
 
 def part_2(parsed_data: list[TaskPair]):
+    if isinstance(parsed_data, (numpy.ndarray, TaskPairStore)):
+        return count_contained_and_overlapping(parsed_data)[1]
     return sum(overlap(task) for task in parsed_data)
 
 def main():
-    data = load_data("data.txt")
-    parsed_data = parse_data(data)
-    print("part 1:", part_1(parsed_data))
-    print("part_2:", part_2(parsed_data))
+    tasks = load_store("data.txt")
+    num_fully_contained, num_overlapping = count_contained_and_overlapping(tasks)
+    print("part 1:", num_fully_contained)
+    print("part_2:", num_overlapping)
 
 if __name__ == "__main__":
-    main()
+    # the vectorized kernel agrees with the per pair reference
+    lines = load_data("data.txt")
+    parsed_data = parse_data(lines)
+    expected = (part_1(parsed_data), part_2(parsed_data))
+    assert count_contained_and_overlapping(parse_array(lines)) == expected
+    assert count_contained_and_overlapping(load_array("data.txt")) == expected
+    assert (part_1(load_array("data.txt")), part_2(load_array("data.txt"))) == expected
+    # every line has to hold exactly two ranges
+    assert load_array_from_bytes(b"1-2,3-4\r\n\n5-6, 7-8").tolist() == [[1, 2, 3, 4], [5, 6, 7, 8]]
+    assert load_array_from_bytes(b"").shape == (0, 4)
+    for raw_data in (b"1-2,3-4,5\n6-7,8\n", b"1-2\n3-4\n5-6\n7-8\n", b"1-2-3,4\n",
+                     b"1,2-3-4\n", b"1 2-3,4-5\n", b"-1-2,3-4\n", b"1-2,3-x\n"):
+        try:
+            load_array_from_bytes(raw_data)
+            raise AssertionError(f"{raw_data!r} should not parse")
+        except ValueError:
+            pass
+
+    # a snapshot is only reused for the exact file it was made from,
+    # even if the new file has an older modification time
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, "data.txt")
+        with open(data_path, "w") as fhandle:
+            fhandle.write("1-2,3-4\n5-6,7-8\n")
+        assert count_contained_and_overlapping(load_store(data_path)) == (0, 0)
+        assert count_contained_and_overlapping(load_store(data_path)) == (0, 0)
+        old_mtime_ns = os.stat(data_path).st_mtime_ns - 10 ** 9
+        with open(data_path, "w") as fhandle:
+            fhandle.write("1-4,2-3\n5-8,5-6\n")
+        os.utime(data_path, ns=(old_mtime_ns, old_mtime_ns))
+        assert count_contained_and_overlapping(load_store(data_path)) == (2, 2)
+        assert len(TaskPairStore.load(f"{data_path}.tasks.npy")) == 2
+        assert sorted(os.listdir(tmp_dir)) \
+            == ["data.txt", "data.txt.tasks.npy", "data.txt.tasks.npy.key"]
+
+    # TaskIndex agrees with brute force pairs of overlap/fully_contained,
+    # on random tasks and on tasks with many identical copies
+    rng = numpy.random.default_rng(0)
+    for max_id, n_tasks in ((20, 40), (4, 30), (100, 1), (3, 60)):
+        bounds = numpy.sort(rng.integers(1, max_id + 1, size=(n_tasks, 2)), axis=1)
+        tasks = [Task(int(low), int(high)) for low, high in bounds]
+        index = TaskIndex.from_tasks(tasks)
+        pairs = [(i, j) for i in range(n_tasks) for j in range(i + 1, n_tasks)]
+        assert index.count_overlapping_pairs() \
+            == sum(overlap(TaskPair(tasks[i], tasks[j])) for i, j in pairs)
+        assert index.count_containing_pairs() \
+            == sum(fully_contained(TaskPair(tasks[i], tasks[j])) for i, j in pairs)
+        assert index.overlap_counts().tolist() \
+            == [sum(overlap(TaskPair(task, other)) for j, other in enumerate(tasks) if j != i)
+                for i, task in enumerate(tasks)]
+        assert index.contained_by_counts().tolist() \
+            == [sum(fully_contained(TaskPair(task, other))
+                    and other.low <= task.low and task.high <= other.high
+                    for j, other in enumerate(tasks) if j != i)
+                for i, task in enumerate(tasks)]
+        assert [index.overlap_count(task) for task in tasks] \
+            == (index.overlap_counts() + 1).tolist()
+    empty = TaskIndex([], [])
+    assert len(empty) == 0
+    assert empty.count_overlapping_pairs() == 0
+    assert empty.count_containing_pairs() == 0
+    assert empty.overlap_counts().tolist() == []
+    assert empty.contained_by_counts().tolist() == []
+    assert empty.overlap_count(Task(1, 5)) == 0
 
+    # dense and compressed SectionCoverage agree with expanding every task
+    for max_id, n_tasks in ((20, 15), (60, 5), (5, 30), (1000, 3)):
+        bounds = numpy.sort(rng.integers(1, max_id + 1, size=(n_tasks, 2)), axis=1)
+        naive = collections.Counter(section for low, high in bounds.tolist()
+                                    for section in range(low, high + 1))
+        first, last = int(bounds[:, 0].min()), int(bounds[:, 1].max())
+        expected_histogram = [naive[section] for section in range(first, last + 1)]
+        for compressed in (True, False):
+            coverage = SectionCoverage.from_tasks(bounds[:, 0], bounds[:, 1], compressed)
+            start, histogram = coverage.histogram()
+            assert start == first and histogram.tolist() == expected_histogram
+            assert coverage.max_concurrency() == max(naive.values())
+            for k in range(max(naive.values()) + 2):
+                sections = [section for section in range(first, last + 1) if naive[section] == k]
+                assert coverage.count_covered(k) == len(sections)
+                ranges = coverage.ranges_covered(k).tolist()
+                assert [section for low, high in ranges
+                        for section in range(low, high + 1)] == sections
+                # ranges are maximal, neighbouring ones never touch
+                assert all(high + 1 < low for (_, high), (low, _) in zip(ranges, ranges[1:]))
+    for compressed in (True, False):
+        empty = SectionCoverage.from_tasks([], [], compressed)
+        assert empty.histogram()[1].tolist() == []
+        assert empty.max_concurrency() == 0
+        assert empty.count_covered(1) == 0
+        assert empty.ranges_covered(0).shape == (0, 2)
+
+    main()
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+checkpoints.py
+@author Luc Kusters
+@date 11-11-2023
+"""
+
+import os
+import tempfile
+import typing
+
+import numpy
+
+import stack
+from parser import check_top_layer, execute_commands, load_procedure
+
+
+class CheckpointIndex(object):
+    """Random access to the stacks after any command of a procedure
+
+    The procedure is executed once, and every `interval` commands a
+    snapshot of all stacks is stored, each stack as a string of crates
+    from bottom to top. The state after command i is then rebuilt from
+    the nearest snapshot at or before i, replaying at most interval - 1
+    commands. A smaller interval trades memory for lower query latency.
+
+    Snapshots are kept in memory, or when a path is given written to
+    that file as one line per snapshot, of which only the byte offsets
+    are kept in memory.
+    """
+
+    def __init__(self, stacks: list[stack.Stack], commands: typing.Iterable,
+                 crane: int = 9000, interval: int = 1000, path: os.PathLike = None):
+        """
+        arguments:
+            stacks (list[stack.Stack]): initial stacks, as returned by
+                drawing_parser, they are not modified
+            commands (numpy.ndarray | Iterable[tuple[int]]): parsed commands
+            crane (int): 9000 or 9001
+            interval (int): number of commands between snapshots
+            path (os.PathLike): file to store the snapshots in
+        """
+        if interval < 1:
+            raise ValueError(f"interval must be at least 1, got {interval}")
+        if not isinstance(commands, numpy.ndarray):
+            commands = numpy.array(list(commands), dtype=numpy.int32).reshape(-1, 3)
+        self.commands = commands
+        self.crane = crane
+        self.interval = interval
+        self.path = path
+        self.__snapshots = []
+        self.__offsets = []
+
+        state = [stack.Stack(_stack.to_list()) for _stack in stacks]
+        fhandle = open(path, "w") if path is not None else None
+        try:
+            for start in range(0, len(commands) + 1, interval):
+                if start > 0:
+                    execute_commands(state, commands[start - interval:start], crane)
+                self.__store(self.__snapshot(state), fhandle)
+        finally:
+            if fhandle is not None:
+                fhandle.close()
+
+    @staticmethod
+    def __snapshot(stacks: list[stack.Stack]) -> list[str]:
+        return ["".join(_stack.to_list()) for _stack in stacks]
+
+    def __store(self, snapshot: list[str], fhandle: typing.TextIO) -> None:
+        if fhandle is None:
+            self.__snapshots.append(snapshot)
+            return
+        self.__offsets.append(fhandle.tell())
+        fhandle.write("\t".join(snapshot) + "\n")
+
+    def __load(self, idx: int) -> list[str]:
+        if self.path is None:
+            return self.__snapshots[idx]
+        with open(self.path, "r") as fhandle:
+            fhandle.seek(self.__offsets[idx])
+            return fhandle.readline().rstrip("\n").split("\t")
+
+    def __len__(self) -> int:
+        """Number of commands in the procedure"""
+        return len(self.commands)
+
+    def state_at(self, i: int) -> list[stack.Stack]:
+        """Stacks after the first i commands (i = 0 is the drawing)"""
+        if not 0 <= i <= len(self.commands):
+            raise IndexError(f"Command index {i} outside of 0 ... {len(self.commands)}")
+        checkpoint = i // self.interval
+        state = [stack.Stack(crates) for crates in self.__load(checkpoint)]
+        execute_commands(state, self.commands[checkpoint * self.interval:i], self.crane)
+        return state
+
+    def top_layer_at(self, i: int) -> str:
+        """Top crates of the non-empty stacks after the first i commands"""
+        return check_top_layer([_stack for _stack in self.state_at(i) if len(_stack)])
+
+
+if __name__ == "__main__":
+    stacks, commands = load_procedure("input.txt")
+    for crane in (9000, 9001):
+        # replaying from the start is the reference
+        expected = []
+        state = [stack.Stack(_stack.to_list()) for _stack in stacks]
+        expected.append([s.to_list() for s in state])
+        for cmd in commands.tolist():
+            execute_commands(state, [cmd], crane)
+            expected.append([s.to_list() for s in state])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for interval, path in ((1, None), (37, None), (10000, None),
+                                   (50, os.path.join(tmp_dir, "snapshots.txt"))):
+                index = CheckpointIndex(stacks, commands, crane, interval, path)
+                for i in (0, 1, 36, 37, 38, 250, len(commands)):
+                    assert [s.to_list() for s in index.state_at(i)] == expected[i]
+                assert index.top_layer_at(len(commands)) \
+                    == check_top_layer([stack.Stack(s) for s in expected[-1] if s])
+    # the drawing is left untouched
+    assert [s.to_list() for s in stacks] == expected[0]
@@ -0,0 +1,193 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cranes.py
+@author Luc Kusters
+@date 11-11-2023
+"""
+
+import abc
+import collections
+import concurrent.futures
+import time
+import typing
+
+import numpy
+
+import stack
+
+
+class CraneModel(abc.ABC):
+    """Semantics of one crane: how a move command rearranges the stacks"""
+
+    name: str = "crane"
+
+    @abc.abstractmethod
+    def move(self, stacks: list[stack.Stack], n_moves: int,
+             from_stack: int, to_stack: int) -> None:
+        """In place execution of one move command"""
+        pass
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name!r})"
+
+
+class CrateMover9000(CraneModel):
+    """Moves crates one at a time, so they end up in reversed order"""
+
+    name = "9000"
+
+    def move(self, stacks, n_moves, from_stack, to_stack):
+        stacks[from_stack].move_to(stacks[to_stack], n_moves)
+
+
+class CrateMover9001(CraneModel):
+    """Moves all crates at once, so they keep their order"""
+
+    name = "9001"
+
+    def move(self, stacks, n_moves, from_stack, to_stack):
+        stacks[from_stack].move_to(stacks[to_stack], n_moves, preserve_order=True)
+
+
+class CapacityLimitedCrane(CraneModel):
+    """Lifts at most `capacity` crates at once
+
+    A move of n crates is done in consecutive lifts of up to capacity
+    crates, each lift keeping its order. A capacity of 1 behaves like the
+    CrateMover9000, an unlimited capacity like the CrateMover9001.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.name = f"capacity-{capacity}"
+
+    def move(self, stacks, n_moves, from_stack, to_stack):
+        while n_moves > 0:
+            lift = min(n_moves, self.capacity)
+            stacks[from_stack].move_to(stacks[to_stack], lift, preserve_order=True)
+            n_moves -= lift
+
+
+CraneResult = collections.namedtuple("CraneResult", ("top_layer", "seconds"))
+
+
+def __as_rows(commands, chunk_size: int) -> typing.Iterator[list[list[int]]]:
+    """Yield chunks of commands as lists of python ints"""
+    if isinstance(commands, numpy.ndarray):
+        for start in range(0, len(commands), chunk_size):
+            yield commands[start:start + chunk_size].tolist()
+        return
+    chunk = []
+    for command in commands:
+        chunk.append(command)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def __top_layer(stacks: list[stack.Stack]) -> str:
+    return "".join(_stack.head() for _stack in stacks if len(_stack))
+
+
+def run_models(models: list[CraneModel], stacks: list[stack.Stack], commands: typing.Iterable,
+               stack_type: type = stack.Stack, chunk_size: int = 4096) -> list[CraneResult]:
+    """Run several crane models over one shared pass of the commands
+
+    Every model gets its own copy of the initial stacks. The commands are
+    consumed once, in chunks, and each chunk is applied to every model
+    before the next one is read, so a lazy command generator works too.
+
+    arguments:
+        models (list[CraneModel]): crane models to run
+        stacks (list[stack.Stack]): initial stacks, they are not modified
+        commands (numpy.ndarray | Iterable[tuple[int]]): parsed commands
+        stack_type (type): stack.Stack or stack.RopeStack
+        chunk_size (int): number of commands applied per model at once
+    returns:
+        results (list[CraneResult]): top layer and seconds spent per model
+    """
+    initial = [_stack.to_list() for _stack in stacks]
+    states = [[stack_type(crates) for crates in initial] for _ in models]
+    seconds = [0.] * len(models)
+    for chunk in __as_rows(commands, chunk_size):
+        for idx, (model, state) in enumerate(zip(models, states)):
+            start = time.perf_counter()
+            for n_moves, from_stack, to_stack in chunk:
+                model.move(state, n_moves, from_stack, to_stack)
+            seconds[idx] += time.perf_counter() - start
+    return [CraneResult(__top_layer(state), elapsed)
+            for state, elapsed in zip(states, seconds)]
+
+
+class CraneRunner(object):
+    """Runs all registered crane models over a single parse of the input"""
+
+    def __init__(self, models: typing.Iterable[CraneModel] = (),
+                 stack_type: type = stack.Stack):
+        self.models = []
+        self.stack_type = stack_type
+        for model in models:
+            self.register(model)
+
+    def register(self, model: CraneModel) -> None:
+        if any(registered.name == model.name for registered in self.models):
+            raise ValueError(f"A crane model named {model.name!r} is already registered")
+        self.models.append(model)
+
+    def run(self, stacks: list[stack.Stack], commands: typing.Iterable,
+            parallel: bool = False, workers: int = None) -> dict[str, CraneResult]:
+        """Run all models and return their results by model name
+
+        arguments:
+            stacks (list[stack.Stack]): initial stacks, they are not modified
+            commands (numpy.ndarray | Iterable[tuple[int]]): parsed commands,
+                with parallel=True they are sent to every process, so pass
+                an array rather than a generator
+            parallel (bool): run every model in its own process
+            workers (int): maximum number of processes
+        returns:
+            results (dict[str, CraneResult]): top layer and seconds per model
+        """
+        if not parallel:
+            results = run_models(self.models, stacks, commands, self.stack_type)
+            return {model.name: result for model, result in zip(self.models, results)}
+
+        if not isinstance(commands, numpy.ndarray):
+            commands = numpy.array(list(commands), dtype=numpy.int32).reshape(-1, 3)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {model.name: pool.submit(run_models, [model], stacks, commands,
+                                               self.stack_type)
+                       for model in self.models}
+            return {name: future.result()[0] for name, future in futures.items()}
+
+
+if __name__ == "__main__":
+    from parser import load_procedure, reverse_trace_top_layer
+
+    stacks, commands = load_procedure("input.txt")
+    runner = CraneRunner([CrateMover9000(), CrateMover9001()])
+    runner.register(CapacityLimitedCrane(1))
+    runner.register(CapacityLimitedCrane(1000))
+    for parallel in (False, True):
+        results = runner.run(stacks, commands, parallel=parallel)
+        assert results["9000"].top_layer == reverse_trace_top_layer(stacks, commands, 9000)
+        assert results["9001"].top_layer == reverse_trace_top_layer(stacks, commands, 9001)
+        assert results["capacity-1"].top_layer == results["9000"].top_layer
+        assert results["capacity-1000"].top_layer == results["9001"].top_layer
+    lazy_stacks, lazy_commands = load_procedure("input.txt", lazy=True)
+    assert runner.run(lazy_stacks, lazy_commands)["9001"].top_layer == results["9001"].top_layer
+    try:
+        runner.register(CrateMover9000())
+        raise AssertionError("registering a name twice should raise")
+    except ValueError:
+        pass
+    try:
+        CraneRunner([CapacityLimitedCrane(2), CapacityLimitedCrane(2), CrateMover9000()])
+        raise AssertionError("passing a name twice should raise")
+    except ValueError:
+        pass
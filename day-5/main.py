@@ -11,14 +11,45 @@ a nice change for once.
 """
 
 import os.path
-from stack import Stack
-from parser import CrateParser, CommandParser
+from stack import RopeStack
+from parser import load_procedure
+from cranes import CraneRunner, CrateMover9000, CrateMover9001
 
 
-def load_crate_data(path: os.path.PathLike) -> list[str]:
-    pass
+def load_crate_data(path: os.PathLike) -> list[str]:
+    """Read the drawing lines, up to the first empty line
 
-def load_command_data(path: os.path.PathLike) -> list[str]:
-    pass
+    Only the line endings are stripped, since the leading spaces
+    tell which stack a crate belongs to.
+    """
+    drawing_lines = []
+    with open(path, "r") as fhandle:
+        for raw_line in fhandle:
+            line = raw_line.rstrip("\r\n")
+            if line.strip() == "":
+                break
+            drawing_lines.append(line)
+    return drawing_lines
 
+def load_command_data(path: os.PathLike) -> list[str]:
+    """Read the command lines, after the first empty line"""
+    with open(path, "r") as fhandle:
+        for raw_line in fhandle:
+            if raw_line.strip() == "":
+                break
+        return [line.strip() for line in fhandle if line.strip() != ""]
 
+
+def main():
+    # parse once, then run both cranes over the same commands
+    stacks, commands = load_procedure("input.txt", stack_type=RopeStack)
+    runner = CraneRunner([CrateMover9000(), CrateMover9001()], stack_type=RopeStack)
+    results = runner.run(stacks, commands)
+    for part, name in ((1, "9000"), (2, "9001")):
+        print(f"-- PART {part} --")
+        print(results[name].top_layer)
+        print(f"({results[name].seconds:.4f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ parser.py
 """
 
 import os
+import typing
+
+import numpy
 
 import stack
 
@@ -25,45 +28,105 @@ def split_at_empty_line(raw_data: list[str]) -> tuple[list[str], list[str]]:
 def __parse_drawing_line(line: str, stacks: list[stack.Stack]) -> None:
     """In place parsing of one line to stacks
 
-    Loops over string, checks if previous char was a '[' and if so
-    pushes the current char to the corresponding stack. Each stack has a
-    spacing of 4 characters, so we know which stack to push to by taking
-    the char_idx of the current char and (integer) deviding by 4
+    Each stack has a spacing of 4 characters and the crate letter sits
+    one character after the '[', so slicing the line from index 1 with
+    step 4 gives the crate (or a space) of every stack in order.
     """
-    last_char = None
-    for idx, char in enumerate(line):
-        if last_char == "[":
-            stacks[idx//4].push(char)
-        last_char = char
+    for stack_idx, char in enumerate(line[1::4]):
+        if char != " ":
+            stacks[stack_idx].push(char)
 
 
 def __get_num_stacks(stacks_counter_line: str) -> int:
-    return sum(1 if char not in (" ",) else 0
-               for char in stacks_counter_line)
+    return len(stacks_counter_line.split())
 
 
-def drawing_parser(drawing_lines: list[str]) -> list[stack.Stack]:
+def drawing_parser(drawing_lines: list[str], stack_type: type = stack.Stack) -> list[stack.Stack]:
+    """Parse the drawing into stacks of type stack_type (Stack or RopeStack)"""
     num_stacks = __get_num_stacks(drawing_lines[-1])
-    stacks = [stack.Stack() for _ in range(num_stacks)]
+    stacks = [stack_type() for _ in range(num_stacks)]
     for line in reversed(drawing_lines[:-1]):
         __parse_drawing_line(line, stacks)
     return stacks
 
 
 def __parse_command_line(command_line: str) -> tuple[int]:
-    split_line = command_line.split(" ")
-    n_moves = int(split_line[1])
-    from_stack = int(split_line[3]) - 1  # account for 0 indexation
-    to_stack = int(split_line[5]) - 1
-    return (n_moves, from_stack, to_stack)
+    return CommandParser.parse_line(command_line)
+
+
+class CrateParser(object):
+    """Parses the drawing part of the input into stacks"""
+
+    def __init__(self, stack_type: type = stack.Stack):
+        self.stack_type = stack_type
+
+    def parse(self, drawing_lines: list[str]) -> list[stack.Stack]:
+        return drawing_parser(drawing_lines, self.stack_type)
+
+
+class CommandParser(object):
+    """Parses "move N from A to B" lines into (n_moves, from_stack, to_stack)
+
+    Stacks are 0 indexed in the output. Commands can be parsed lazily one
+    by one (iter_commands) or compiled in bulk into a compact N x 3 int32
+    array (compile), so that executing them needs no string work.
+    """
+
+    @staticmethod
+    def parse_line(command_line: str) -> tuple[int]:
+        split_line = command_line.split()
+        n_moves = int(split_line[1])
+        from_stack = int(split_line[3]) - 1  # account for 0 indexation
+        to_stack = int(split_line[5]) - 1
+        return (n_moves, from_stack, to_stack)
+
+    def iter_commands(self, command_lines: typing.Iterable[str]) -> typing.Iterator[tuple[int]]:
+        """Lazily parse command lines, skipping empty ones"""
+        for command_line in command_lines:
+            if command_line.strip() != "":
+                yield self.parse_line(command_line)
+
+    def compile(self, command_lines: typing.Iterable[str]) -> numpy.ndarray:
+        """Parse all command lines at once into an N x 3 int32 array"""
+        return self.compile_bytes("\n".join(command_lines).encode("ascii"))
+
+    def compile_bytes(self, raw_commands: bytes, chunk_size: int = 1 << 20) -> numpy.ndarray:
+        """Parse the raw command section into an N x 3 int32 array
+
+        Every command is six words, of which words 1, 3 and 5 are the
+        numbers, so a split and three strided slices give all of them
+        without looking at the lines one by one. This is done per chunk
+        of about chunk_size bytes of whole lines, straight into an array
+        allocated for one command per line, so only the words of a
+        single chunk exist at any time.
+        """
+        commands = numpy.empty((raw_commands.count(b"\n") + 1, 3), dtype=numpy.int32)
+        n_commands = 0
+        start = 0
+        while start < len(raw_commands):
+            end = raw_commands.find(b"\n", start + chunk_size)
+            end = len(raw_commands) if end == -1 else end + 1
+            words = raw_commands[start:end].split()
+            start = end
+            if len(words) % 6 != 0 or any(word != b"move" for word in set(words[0::6])):
+                raise RuntimeError("Command section is not made of 'move N from A to B' lines")
+            chunk = commands[n_commands:n_commands + len(words) // 6]
+            for column, offset in enumerate((1, 3, 5)):
+                chunk[:, column] = numpy.fromiter(map(int, words[offset::6]), dtype=numpy.int32,
+                                                  count=len(chunk))
+            n_commands += len(chunk)
+        commands = commands[:n_commands].copy()
+        commands[:, 1:] -= 1  # account for 0 indexation
+        return commands
 
 
 def __execute_command(cmd: tuple[int], stacks: list[stack.Stack]) -> None:
-    """In place execution of move command"""
+    """In place execution of move command
+
+    crates are moved one at a time, so they end up in reversed order
+    """
     n_moves, from_stack, to_stack = cmd
-    for _ in range(n_moves):
-        char = stacks[from_stack].pop()
-        stacks[to_stack].push(char)
+    stacks[from_stack].move_to(stacks[to_stack], n_moves)
 
 def __execute_9001_command(cmd: tuple[int], stacks: list[stack.Stack]) -> None:
     """In place executeion of 9001 command
@@ -71,13 +134,67 @@ def __execute_9001_command(cmd: tuple[int], stacks: list[stack.Stack]) -> None:
     the 9001 model can pick up multiple crates at once
     """
     n_moves, from_stack, to_stack = cmd
-    picked_up_crates = []
-    for _ in range(n_moves):
-        char = stacks[from_stack].pop()
-        picked_up_crates.append(char)
-    # reverse push order to simulate multi-crate lifting
-    for char in reversed(picked_up_crates):
-        stacks[to_stack].push(char)
+    stacks[from_stack].move_to(stacks[to_stack], n_moves, preserve_order=True)
+
+
+def __iter_command_file(path: os.PathLike, offset: int) -> typing.Iterator[tuple[int]]:
+    with open(path, "rb") as fhandle:
+        fhandle.seek(offset)
+        yield from CommandParser().iter_commands(line.decode("ascii") for line in fhandle)
+
+
+def load_procedure(path: os.PathLike, stack_type: type = stack.Stack,
+                   lazy: bool = False) -> tuple[list[stack.Stack], typing.Iterable]:
+    """Load the drawing and the commands of an input file in one go
+
+    The drawing lines are read up to the first empty line, keeping their
+    leading spaces, and parsed into stacks. The command section is then
+    compiled into an N x 3 int32 array, or with lazy=True returned as a
+    generator that parses the commands while they are being executed.
+
+    arguments:
+        path (os.PathLike): path to input file
+        stack_type (type): stack.Stack or stack.RopeStack
+        lazy (bool): return the commands as a generator
+    returns:
+        stacks (list[stack.Stack]): initial stacks
+        commands (numpy.ndarray | Iterator[tuple[int]]): parsed commands
+    """
+    drawing = []
+    with open(path, "rb") as fhandle:
+        while True:
+            raw_line = fhandle.readline()
+            if not raw_line:
+                raise RuntimeError("No empty line found")
+            line = raw_line.decode("ascii").rstrip("\r\n")
+            if line.strip() == "":
+                break
+            drawing.append(line)
+        stacks = drawing_parser(drawing, stack_type)
+        if lazy:
+            return stacks, __iter_command_file(path, fhandle.tell())
+        return stacks, CommandParser().compile_bytes(fhandle.read())
+
+
+def execute_commands(stacks: list[stack.Stack], commands: typing.Iterable,
+                     crane: int = 9000, chunk_size: int = 1 << 16) -> None:
+    """In place execution of parsed commands
+
+    arguments:
+        stacks (list[stack.Stack]): stacks to move crates on
+        commands (numpy.ndarray | Iterable[tuple[int]]): parsed commands
+        crane (int): 9000 (one crate at a time) or 9001 (all at once)
+        chunk_size (int): rows of an array converted to python ints at once
+    """
+    if crane not in (9000, 9001):
+        raise ValueError(f"Unknown crane model {crane}, expected 9000 or 9001")
+    preserve_order = crane == 9001
+    if isinstance(commands, numpy.ndarray):
+        array = commands
+        commands = (cmd for start in range(0, len(array), chunk_size)
+                    for cmd in array[start:start + chunk_size].tolist())
+    for n_moves, from_stack, to_stack in commands:
+        stacks[from_stack].move_to(stacks[to_stack], n_moves, preserve_order)
 
 
 def load_data(path: os.PathLike):
@@ -93,34 +210,85 @@ def __check_top_layer(stacks: list[stack.Stack]) -> str:
     return top_layer
 
 
+# public function
+check_top_layer = __check_top_layer
+
+
+def reverse_trace_top_layer(stacks: list[stack.Stack], commands: list[tuple[int]],
+                            crane: int = 9000) -> str:
+    """Find the top layer without moving any crates
+
+    First the final height of every stack is found by only counting
+    crates. Then, for every stack that ends up non-empty, the position of
+    its top crate (stack, depth below the top) is traced back through the
+    commands in reverse order. Undoing a move from A to B:
+        - a crate among the top n of B came from the top n of A, at
+          depth n - 1 - depth (9000, one at a time) or at the same
+          depth (9001, all at once)
+        - a deeper crate in B was n crates less deep
+        - a crate in A was n crates deeper
+    The position left after the first command is looked up in the
+    initial drawing. Runtime depends on commands x stacks only, not on
+    how many crates are moved.
+
+    arguments:
+        stacks (list[stack.Stack]): initial stacks, as returned by
+            drawing_parser, they are not modified
+        commands (list[tuple[int]]): parsed (n_moves, from_stack, to_stack)
+        crane (int): 9000 or 9001
+    returns:
+        top_layer (str): top crates of all non-empty stacks
+    """
+    if crane not in (9000, 9001):
+        raise ValueError(f"Unknown crane model {crane}, expected 9000 or 9001")
+    if isinstance(commands, numpy.ndarray):
+        commands = commands.tolist()
+    commands = list(commands)
+    heights = [len(_stack) for _stack in stacks]
+    for n_moves, from_stack, to_stack in commands:
+        if n_moves > heights[from_stack]:
+            raise IndexError(f"Cannot move {n_moves} crates from stack {from_stack + 1}"
+                             f" holding {heights[from_stack]}")
+        heights[from_stack] -= n_moves
+        heights[to_stack] += n_moves
+
+    positions = [(idx, 0) for idx, height in enumerate(heights) if height > 0]
+    for n_moves, from_stack, to_stack in reversed(commands):
+        if from_stack == to_stack:
+            continue
+        for i, (stack_idx, depth) in enumerate(positions):
+            if stack_idx == to_stack:
+                if depth < n_moves:
+                    if crane == 9000:
+                        depth = n_moves - 1 - depth
+                    positions[i] = (from_stack, depth)
+                else:
+                    positions[i] = (to_stack, depth - n_moves)
+            elif stack_idx == from_stack:
+                positions[i] = (from_stack, depth + n_moves)
+
+    initial = [_stack.to_list() for _stack in stacks]
+    return "".join(initial[stack_idx][-1 - depth] for stack_idx, depth in positions)
+
+
 def part_1() -> str:
-    raw_data = load_data("input.txt")
-    drawing, commands = split_at_empty_line(raw_data)
-    stacks = drawing_parser(drawing)
-    for command_line in commands:
-        command = __parse_command_line(command_line)
-        __execute_command(command, stacks)
-    top_layer = __check_top_layer(stacks)
-    return top_layer
+    stacks, commands = load_procedure("input.txt")
+    return reverse_trace_top_layer(stacks, commands, crane=9000)
 
 
 def part_2():
-    raw_data = load_data("input.txt")
-    drawing, commands = split_at_empty_line(raw_data)
-    stacks = drawing_parser(drawing)
-    for command_line in commands:
-        command = __parse_command_line(command_line)
-        __execute_9001_command(command, stacks)
-    top_layer = __check_top_layer(stacks)
-    return top_layer
+    stacks, commands = load_procedure("input.txt")
+    return reverse_trace_top_layer(stacks, commands, crane=9001)
 
 
 
 def main():
+    # parse once and answer both parts from the same stacks and commands
+    stacks, commands = load_procedure("input.txt")
     print("-- PART 1 --")
-    print(part_1())
+    print(reverse_trace_top_layer(stacks, commands, crane=9000))
     print("-- PART 2 --")
-    print(part_2())
+    print(reverse_trace_top_layer(stacks, commands, crane=9001))
 
 
 if __name__ == "__main__":
@@ -143,6 +311,42 @@ if __name__ == "__main__":
         cmd = __parse_command_line(cmd_line)
         __execute_command(cmd, stacks)
         print(stacks)
+    assert __check_top_layer(stacks) == "CMZ"
+
+    # reverse trace agrees with moving the crates
+    commands = [__parse_command_line(cmd_line) for cmd_line in test_commands]
+    assert reverse_trace_top_layer(drawing_parser(test_drawing), commands) == "CMZ"
+    assert reverse_trace_top_layer(drawing_parser(test_drawing), commands, crane=9001) == "MCD"
+    drawing, command_lines = split_at_empty_line(load_data("input.txt"))
+    commands = [__parse_command_line(cmd_line) for cmd_line in command_lines]
+    for crane, execute in ((9000, __execute_command), (9001, __execute_9001_command)):
+        stacks = drawing_parser(drawing)
+        for cmd in commands:
+            execute(cmd, stacks)
+        assert reverse_trace_top_layer(drawing_parser(drawing), commands, crane) \
+            == __check_top_layer(stacks)
+        # and so do rope stacks
+        rope_stacks = drawing_parser(drawing, stack_type=stack.RopeStack)
+        for cmd in commands:
+            execute(cmd, rope_stacks)
+        assert [s.to_list() for s in rope_stacks] == [s.to_list() for s in stacks]
+        # and so does the compiled and the lazy procedure
+        for lazy in (False, True):
+            loaded_stacks, loaded_commands = load_procedure("input.txt", lazy=lazy)
+            execute_commands(loaded_stacks, loaded_commands, crane)
+            assert [s.to_list() for s in loaded_stacks] == [s.to_list() for s in stacks]
+    compiled = CommandParser().compile(test_commands)
+    assert compiled.dtype == numpy.int32
+    assert compiled.tolist() == [list(__parse_command_line(l)) for l in test_commands]
+    # chunked compiling gives the same array for any chunk size
+    with open("input.txt", "rb") as fhandle:
+        raw_commands = fhandle.read().split(b"\n\n", 1)[1]
+    for chunk_size in (1, 100, 1 << 20):
+        assert CommandParser().compile_bytes(raw_commands, chunk_size).tolist() \
+            == [list(cmd) for cmd in commands]
+    assert CommandParser().compile_bytes(b"").shape == (0, 3)
+    assert list(CommandParser().iter_commands(test_commands)) \
+        == [__parse_command_line(l) for l in test_commands]
     print("======== END TEST ========")
 
     main()
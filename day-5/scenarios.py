@@ -0,0 +1,152 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scenarios.py
+@author Luc Kusters
+@date 11-11-2023
+"""
+
+import typing
+
+import numpy
+
+import stack
+from parser import execute_commands, load_procedure, reverse_trace_top_layer
+
+
+EMPTY = 0  # crate code of an empty slot
+
+
+def stack_scenarios(scenarios: list[list[stack.Stack]]) -> tuple[numpy.ndarray, numpy.ndarray]:
+    """Pack many starting layouts into one padded array
+
+    Crates are stored by their character code, bottom first, and every
+    stack is padded with EMPTY up to the total number of crates of the
+    largest scenario, so that any stack can hold every crate.
+
+    arguments:
+        scenarios (list[list[stack.Stack]]): initial stacks per scenario,
+            e.g. drawing_parser output, all with the same number of stacks
+    returns:
+        crates (numpy.ndarray): uint8 array of shape (scenarios, stacks, height)
+        heights (numpy.ndarray): int64 array of shape (scenarios, stacks)
+    """
+    layouts = [[_stack.to_list() for _stack in stacks] for stacks in scenarios]
+    num_stacks = {len(layout) for layout in layouts}
+    if len(num_stacks) > 1:
+        raise ValueError("All scenarios need the same number of stacks")
+    num_stacks = num_stacks.pop() if num_stacks else 0
+    heights = numpy.array([[len(crates) for crates in layout] for layout in layouts],
+                          dtype=numpy.int64).reshape(len(layouts), num_stacks)
+    capacity = int(heights.sum(axis=1).max()) if len(layouts) else 0
+    crates = numpy.full((len(layouts), num_stacks, capacity), EMPTY, dtype=numpy.uint8)
+    for scenario, layout in enumerate(layouts):
+        for stack_idx, stack_crates in enumerate(layout):
+            crates[scenario, stack_idx, :len(stack_crates)] = [ord(c) for c in stack_crates]
+    return crates, heights
+
+
+def execute_batched(crates: numpy.ndarray, heights: numpy.ndarray,
+                    commands: typing.Iterable, crane: int = 9000) -> None:
+    """In place execution of the same commands on every scenario at once
+
+    The stacks have different heights per scenario, so the n crates of a
+    move sit at a different depth in every scenario. They are gathered
+    with one fancy index of shape (scenarios, n), reversed for the 9000
+    crane, and scattered on top of the target stacks in the same way.
+
+    arguments:
+        crates (numpy.ndarray): see stack_scenarios, modified in place
+        heights (numpy.ndarray): see stack_scenarios, modified in place
+        commands (numpy.ndarray | Iterable[tuple[int]]): parsed commands
+        crane (int): 9000 or 9001
+    """
+    if crane not in (9000, 9001):
+        raise ValueError(f"Unknown crane model {crane}, expected 9000 or 9001")
+    if isinstance(commands, numpy.ndarray):
+        commands = commands.tolist()
+    scenario_idx = numpy.arange(len(crates))[:, None]
+    for n_moves, from_stack, to_stack in commands:
+        # checked before skipping no-op moves, like Stack.move_to does
+        if numpy.any(heights[:, from_stack] < n_moves):
+            raise IndexError(f"Cannot move {n_moves} crates from stack {from_stack + 1}"
+                             " in every scenario")
+        if n_moves <= 0 or from_stack == to_stack:
+            continue
+        offsets = numpy.arange(n_moves)
+        source = heights[:, from_stack, None] - n_moves + offsets
+        moved = crates[scenario_idx, from_stack, source]
+        if crane == 9000:
+            moved = moved[:, ::-1]
+        crates[scenario_idx, from_stack, source] = EMPTY
+        crates[scenario_idx, to_stack, heights[:, to_stack, None] + offsets] = moved
+        heights[:, from_stack] -= n_moves
+        heights[:, to_stack] += n_moves
+
+
+def top_layers(crates: numpy.ndarray, heights: numpy.ndarray) -> list[str]:
+    """Top crates of the non-empty stacks, per scenario"""
+    if crates.shape[2] == 0:
+        # no crates in any scenario, so there is no slot to take from
+        return [""] * len(crates)
+    tops = numpy.take_along_axis(crates, numpy.maximum(heights - 1, 0)[:, :, None], axis=2)[:, :, 0]
+    return ["".join(chr(code) for code in scenario_tops[scenario_heights > 0])
+            for scenario_tops, scenario_heights in zip(tops, heights)]
+
+
+def batched_top_layers(scenarios: list[list[stack.Stack]], commands: typing.Iterable,
+                       crane: int = 9000) -> list[str]:
+    """Run one procedure on many starting layouts and return every top layer"""
+    crates, heights = stack_scenarios(scenarios)
+    execute_batched(crates, heights, commands, crane)
+    return top_layers(crates, heights)
+
+
+def shuffled_scenarios(stacks: list[stack.Stack], n_scenarios: int,
+                       seed: int = None) -> list[list[stack.Stack]]:
+    """Random layouts with the crates of stacks shuffled over the same stack heights
+
+    Keeping the heights keeps every command of the procedure valid.
+    """
+    rng = numpy.random.default_rng(seed)
+    heights = [len(_stack) for _stack in stacks]
+    all_crates = numpy.array([crate for _stack in stacks for crate in _stack.to_list()])
+    bounds = numpy.cumsum([0] + heights)
+    scenarios = []
+    for _ in range(n_scenarios):
+        shuffled = rng.permutation(all_crates).tolist()
+        scenarios.append([stack.Stack(shuffled[start:end])
+                          for start, end in zip(bounds[:-1], bounds[1:])])
+    return scenarios
+
+
+if __name__ == "__main__":
+    stacks, commands = load_procedure("input.txt")
+    scenarios = [stacks] + shuffled_scenarios(stacks, 20, seed=0)
+    for crane in (9000, 9001):
+        expected = [reverse_trace_top_layer(scenario, commands, crane) for scenario in scenarios]
+        assert batched_top_layers(scenarios, commands, crane) == expected
+        # the full layout matches too, not just the top
+        crates, heights = stack_scenarios(scenarios[:3])
+        execute_batched(crates, heights, commands, crane)
+        for scenario, scenario_crates, scenario_heights in zip(scenarios, crates, heights):
+            state = [stack.Stack(_stack.to_list()) for _stack in scenario]
+            execute_commands(state, commands, crane)
+            assert [[chr(c) for c in row[:h]] for row, h in zip(scenario_crates, scenario_heights)] \
+                == [_stack.to_list() for _stack in state]
+    # layouts without any crate
+    empty_layouts = [[stack.Stack([]) for _ in range(3)] for _ in range(2)]
+    assert batched_top_layers(empty_layouts, [(0, 0, 1)]) == ["", ""]
+    assert batched_top_layers([], []) == []
+    # moving more crates than a stack holds raises, also onto the same stack
+    small_layout = [stack.Stack(["a", "b"]), stack.Stack(["c"])]
+    for command in ((5, 0, 0), (2, 1, 0)):
+        for execute in (lambda: batched_top_layers([small_layout], [command]),
+                        lambda: execute_commands([stack.Stack(s.to_list()) for s in small_layout],
+                                                 [command])):
+            try:
+                execute()
+                raise AssertionError(f"{command} should raise")
+            except IndexError:
+                pass
+    assert batched_top_layers([small_layout], [(2, 0, 0)]) == ["bc"]
@@ -7,6 +7,7 @@ Stack.py
 """
 
 import abc
+import collections
 
 
 class BaseNode(abc.ABC):
@@ -53,8 +54,11 @@ class Node(BaseNode):
         return f"Node(value={self.value}, next={self.next})"
 
 
-class Stack(object):
-    """Implements a Stack using a linked list"""
+class LinkedStack(object):
+    """Implements a Stack using a linked list
+
+    Kept as a reference implementation, see Stack for the one in use.
+    """
 
     def __init__(self):
         self.__head = None
@@ -99,7 +103,230 @@ class Stack(object):
         return self.__counter
 
     def __repr__(self):
-        return f"Stack{tuple(n.value for n in self.to_list())}"
+        return f"LinkedStack{tuple(n.value for n in self.to_list())}"
+
+
+class Stack(object):
+    """Implements a Stack using a python list
+
+    The top of the stack is the end of the list, so push and pop are
+    list.append and list.pop. Moving several crates at once is a single
+    slice operation instead of a pop and push per crate.
+    """
+
+    __slots__ = ("__items",)
+
+    def __init__(self, values=()):
+        self.__items = list(values)
+
+    def push(self, value) -> None:
+        """Push a value to the stack"""
+        self.__items.append(value)
+
+    def pop(self):
+        """Remove and return the top value, raises IndexError if empty"""
+        return self.__items.pop()
+
+    def head(self):
+        if not self.__items:
+            return None
+        return self.__items[-1]
+
+    def move_to(self, other, n: int, preserve_order: bool = False) -> None:
+        """Move the top n values of this stack onto another stack
+
+        arguments:
+            other (Stack): stack to move the values to
+            n (int): number of values to move
+            preserve_order (bool): if False the values are moved one at a
+                time, so they end up reversed (CrateMover 9000). If True
+                they are moved all at once and keep their order (9001).
+        """
+        if n > len(self.__items):
+            raise IndexError(f"Cannot move {n} values from a stack"
+                             f" of length {len(self.__items)}")
+        if n <= 0 or other is self:
+            # moving crates onto their own stack, even one by one, changes nothing
+            return
+        moved = self.__items[-n:]
+        del self.__items[-n:]
+        if not preserve_order:
+            moved.reverse()
+        if isinstance(other, Stack):
+            other.__items.extend(moved)
+        else:
+            for value in moved:
+                other.push(value)
+
+    def to_list(self) -> list:
+        """Return the values from bottom to top"""
+        return list(self.__items)
+
+    def to_tuple(self) -> tuple:
+        return tuple(self.__items)
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __repr__(self):
+        return f"Stack{tuple(self.__items)}"
+
+
+class Block(object):
+    """View on the range [start, stop) of a list, possibly reversed
+
+    Blocks never copy their data; splitting or reversing a block gives
+    new views on the same list.
+    """
+
+    __slots__ = ("data", "start", "stop", "reverse")
+
+    def __init__(self, data: list, start: int, stop: int, reverse: bool = False):
+        self.data = data
+        self.start = start
+        self.stop = stop
+        self.reverse = reverse
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def top(self):
+        return self.data[self.start] if self.reverse else self.data[self.stop - 1]
+
+    def split(self, k: int) -> tuple["Block", "Block"]:
+        """Split into the bottom k values and the values above them"""
+        if self.reverse:
+            return (Block(self.data, self.stop - k, self.stop, True),
+                    Block(self.data, self.start, self.stop - k, True))
+        return (Block(self.data, self.start, self.start + k),
+                Block(self.data, self.start + k, self.stop))
+
+    def reversed(self) -> "Block":
+        return Block(self.data, self.start, self.stop, not self.reverse)
+
+    def values(self) -> list:
+        """Return the values from bottom to top"""
+        values = self.data[self.start:self.stop]
+        if self.reverse:
+            values.reverse()
+        return values
+
+
+class RopeStack(object):
+    """Implements a Stack as a deque of Blocks
+
+    Same API as Stack, but moving n crates between two RopeStacks splits
+    at most one block and relinks the others, instead of copying every
+    crate. For the 9000 crane the moved blocks are relinked in reverse
+    order as reversed views. A move costs O(blocks touched), whatever
+    the number of crates.
+    """
+
+    __slots__ = ("__blocks", "__counter")
+
+    def __init__(self, values=()):
+        values = list(values)
+        self.__blocks = collections.deque()
+        if values:
+            self.__blocks.append(Block(values, 0, len(values)))
+        self.__counter = len(values)
+
+    def push(self, value) -> None:
+        """Push a value to the stack
+
+        The value is appended to the list of the top block if that
+        block ends at the end of its list, otherwise a new block is made.
+        """
+        top = self.__blocks[-1] if self.__blocks else None
+        if top is not None and not top.reverse and top.stop == len(top.data):
+            top.data.append(value)
+            top.stop += 1
+        else:
+            self.__blocks.append(Block([value], 0, 1))
+        self.__counter += 1
+
+    def pop(self):
+        """Remove and return the top value, raises IndexError if empty"""
+        if not self.__blocks:
+            raise IndexError("pop from empty stack")
+        top = self.__blocks[-1]
+        value = top.top()
+        if top.reverse:
+            top.start += 1
+        else:
+            top.stop -= 1
+        if len(top) == 0:
+            self.__blocks.pop()
+        self.__counter -= 1
+        return value
+
+    def head(self):
+        if not self.__blocks:
+            return None
+        return self.__blocks[-1].top()
+
+    def move_to(self, other, n: int, preserve_order: bool = False) -> None:
+        """Move the top n values of this stack onto another stack
+
+        See Stack.move_to. When other is a RopeStack no values are copied.
+        """
+        if n > self.__counter:
+            raise IndexError(f"Cannot move {n} values from a stack"
+                             f" of length {self.__counter}")
+        if n <= 0 or other is self:
+            return
+        # blocks taken off the top, topmost first
+        taken = []
+        remaining = n
+        while remaining:
+            top = self.__blocks[-1]
+            if len(top) <= remaining:
+                taken.append(self.__blocks.pop())
+                remaining -= len(top)
+            else:
+                lower, upper = top.split(len(top) - remaining)
+                self.__blocks[-1] = lower
+                taken.append(upper)
+                remaining = 0
+        self.__counter -= n
+
+        if preserve_order:
+            moved = reversed(taken)
+        else:
+            moved = (block.reversed() for block in taken)
+        if isinstance(other, RopeStack):
+            other.__blocks.extend(moved)
+            other.__counter += n
+        else:
+            for block in moved:
+                for value in block.values():
+                    other.push(value)
+
+    def num_blocks(self) -> int:
+        return len(self.__blocks)
+
+    def compact(self) -> None:
+        """Copy all values into a single block"""
+        values = self.to_list()
+        self.__blocks.clear()
+        if values:
+            self.__blocks.append(Block(values, 0, len(values)))
+
+    def to_list(self) -> list:
+        """Return the values from bottom to top"""
+        values = []
+        for block in self.__blocks:
+            values.extend(block.values())
+        return values
+
+    def to_tuple(self) -> tuple:
+        return tuple(self.to_list())
+
+    def __len__(self):
+        return self.__counter
+
+    def __repr__(self):
+        return f"RopeStack{self.to_tuple()}"
 
 
 if __name__ == "__main__":
@@ -147,3 +374,55 @@ if __name__ == "__main__":
     assert stack.pop() == "c"
     assert stack.pop() == 2
     assert stack.pop() == 1
+
+    # linked stack tests
+    stack = LinkedStack()
+    stack.push(1)
+    stack.push(2)
+    stack.push("c")
+    assert len(stack) == 3
+    assert stack.pop() == "c"
+    assert stack.pop() == 2
+    assert stack.pop() == 1
+
+    # bulk move tests
+    stack = Stack("abcd")
+    other = Stack("x")
+    stack.move_to(other, 2)
+    assert stack.to_tuple() == ("a", "b")
+    assert other.to_tuple() == ("x", "d", "c")
+    other.move_to(stack, 3, preserve_order=True)
+    assert stack.to_list() == ["a", "b", "x", "d", "c"]
+    assert len(other) == 0 and other.head() is None
+    stack.move_to(other, 0)
+    assert len(stack) == 5
+    try:
+        other.move_to(stack, 1)
+        raise AssertionError("moving from an empty stack should raise")
+    except IndexError:
+        pass
+
+    # rope stack tests, same as the bulk move tests
+    stack = RopeStack("abcd")
+    other = RopeStack("x")
+    stack.move_to(other, 2)
+    assert stack.to_tuple() == ("a", "b")
+    assert other.to_tuple() == ("x", "d", "c")
+    other.move_to(stack, 3, preserve_order=True)
+    assert stack.to_list() == ["a", "b", "x", "d", "c"]
+    assert len(other) == 0 and other.head() is None
+    assert stack.pop() == "c" and stack.head() == "d"
+    stack.push("e")
+    assert stack.to_list() == ["a", "b", "x", "d", "e"]
+    # moves relink blocks instead of copying crates
+    stack = RopeStack(range(100000))
+    other = RopeStack()
+    stack.move_to(other, 50000)
+    assert other.num_blocks() == 1 and other.head() == 50000
+    other.move_to(stack, 50000, preserve_order=True)
+    assert stack.num_blocks() == 2 and stack.head() == 50000
+    # and agree with Stack
+    stack = RopeStack("abcdef")
+    other = Stack()
+    stack.move_to(other, 4)
+    assert other.to_list() == ["f", "e", "d", "c"]
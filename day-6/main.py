@@ -7,10 +7,14 @@ main.py
 """
 
 import collections
+import concurrent.futures
+import mmap
+import os
+import typing
 
 
-def get_marker_n_leading_characters(string,
-                                    marker_nchars=4):
+def __get_marker_n_leading_characters_reference(string, marker_nchars=4):
+    """Reference implementation, builds a set of the window at every step"""
     assert len(string) >= marker_nchars
     chunk = collections.deque([], maxlen=marker_nchars)
     for i, char in enumerate(string):
@@ -19,29 +23,228 @@ def get_marker_n_leading_characters(string,
             return i + 1
 
 
-with open("input.txt", "r") as fhandle:
-    message = fhandle.read().strip()
-
-
-print("Part 1")
-print("tests...")
-print(get_marker_n_leading_characters("bvwbjplbgvbhsrlpgdmjqwftvncz"))
-print(get_marker_n_leading_characters("nppdvjthqldpwncqszvftbrmjlhg"))
-print(get_marker_n_leading_characters("nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg"))
-print(get_marker_n_leading_characters("zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw"))
-print("part 1 answer")
-print(get_marker_n_leading_characters(message))
-
-
-print("Part 2")
-print("tests...")
-print(get_marker_n_leading_characters(
-    "bvwbjplbgvbhsrlpgdmjqwftvncz", marker_nchars=14))
-print(get_marker_n_leading_characters(
-    "nppdvjthqldpwncqszvftbrmjlhg", marker_nchars=14))
-print(get_marker_n_leading_characters(
-    "nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg", marker_nchars=14))
-print(get_marker_n_leading_characters(
-    "zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw"), marker_nchars=14)
-print("part 2 answer")
-print(get_marker_n_leading_characters(message, marker_nchars=14))
+def get_markers(string, marker_nchars=(4, 14)) -> dict[int, int]:
+    """Find the first marker of several window sizes in one scan
+
+    Keeps the index at which every symbol was last seen, and the start
+    of the longest window of distinct symbols ending at the current
+    position. When a symbol repeats inside that window, the window start
+    jumps past its previous occurence. A marker of k characters ends at
+    the first position where that window is at least k long. This is
+    O(n), without any allocation per character.
+
+    arguments:
+        string (str | bytes): datastream
+        marker_nchars (tuple[int]): window sizes to look for
+    returns:
+        markers (dict[int, int]): number of characters processed up to and
+            including the first marker, per window size (None if not found)
+    """
+    markers = dict.fromkeys(marker_nchars)
+    remaining = sorted(set(marker_nchars))
+    last_seen = {}
+    window_start = 0
+    for i, char in enumerate(string):
+        previous = last_seen.get(char, -1)
+        if previous >= window_start:
+            window_start = previous + 1
+        last_seen[char] = i
+        while remaining and i - window_start + 1 >= remaining[0]:
+            markers[remaining.pop(0)] = i + 1
+        if not remaining:
+            break
+    return markers
+
+
+def get_marker_n_leading_characters(string,
+                                    marker_nchars=4):
+    assert len(string) >= marker_nchars
+    return get_markers(string, (marker_nchars,))[marker_nchars]
+
+
+def __iter_chunks(stream, chunk_size: int) -> typing.Iterator[bytes]:
+    """Yield byte chunks from a binary file or from an iterable of chunks"""
+    if hasattr(stream, "read"):
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from stream
+
+
+def stream_markers(stream, marker_nchars=4, every=False,
+                   chunk_size=1 << 16) -> typing.Iterator[int]:
+    """Search a datastream of unbounded length for markers, chunk by chunk
+
+    Uses the same last-seen table as get_markers, indexed by byte value
+    and holding absolute positions. That table and the start of the
+    current distinct window are all that is carried from one chunk to the
+    next, which covers the last marker_nchars - 1 bytes of the previous
+    chunk, so memory is bounded by the chunk size. Bytes are taken as
+    they are, a trailing newline is not stripped.
+
+    arguments:
+        stream (BinaryIO | Iterable[bytes]): binary file (or pipe), or
+            an iterable of byte chunks
+        marker_nchars (int): window size
+        every (bool): yield every position at which a window of
+            marker_nchars distinct bytes ends, not only the first one
+        chunk_size (int): number of bytes read at once from a file
+    yields:
+        position (int): number of bytes processed up to and including
+            the marker, as returned by get_marker_n_leading_characters
+    """
+    last_seen = [-1] * 256
+    window_start = 0
+    offset = 0
+    for chunk in __iter_chunks(stream, chunk_size):
+        for i, byte in enumerate(chunk, start=offset):
+            previous = last_seen[byte]
+            if previous >= window_start:
+                window_start = previous + 1
+            last_seen[byte] = i
+            if i - window_start + 1 >= marker_nchars:
+                yield i + 1
+                if not every:
+                    return
+        offset += len(chunk)
+
+
+def __search_range(path: os.PathLike, start: int, end: int, marker_nchars: int) -> int:
+    """First marker ending in bytes [start, end) of a file, as absolute position"""
+    with open(path, "rb") as fhandle:
+        with mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[start:end]
+    marker = get_markers(data, (marker_nchars,))[marker_nchars]
+    return None if marker is None else start + marker
+
+
+def __stripped_bounds(path: os.PathLike) -> tuple[int, int]:
+    """Byte range of the file content without leading and trailing whitespace"""
+    if os.path.getsize(path) == 0:
+        return 0, 0
+    with open(path, "rb") as fhandle:
+        with mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            low, high = 0, len(mapped)
+            while low < high and mapped[low:low + 1].isspace():
+                low += 1
+            while high > low and mapped[high - 1:high].isspace():
+                high -= 1
+    return low, high
+
+
+def parallel_marker_search(path: os.PathLike, marker_nchars=4, workers=None,
+                           chunk_size=1 << 24) -> int:
+    """Search a large file for the first marker with a process pool
+
+    The stripped content of the file is split into ranges of chunk_size
+    bytes, each extended backwards by marker_nchars - 1 bytes so that every
+    window lies fully inside at least one range. Ranges are searched in
+    parallel from a memory map. Every hit is a real distinct window, so
+    the earliest hit is the global answer; once a range has a hit, the
+    ranges after it that did not start yet are cancelled.
+
+    arguments:
+        path (os.PathLike): path to datastream file
+        marker_nchars (int): window size
+        workers (int): number of processes, defaults to os.cpu_count()
+        chunk_size (int): number of bytes per range
+    returns:
+        position (int): same as get_marker_n_leading_characters on the
+            stripped file content, None if there is no marker
+    """
+    low, high = __stripped_bounds(path)
+    assert high - low >= marker_nchars
+    ranges = [(max(low, start - (marker_nchars - 1)), min(high, start + chunk_size))
+              for start in range(low, high, chunk_size)]
+    best = None
+    best_idx = len(ranges)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(__search_range, path, start, end, marker_nchars): idx
+                   for idx, (start, end) in enumerate(ranges)}
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            result = future.result()
+            if result is None or (best is not None and result >= best):
+                continue
+            best = result
+            best_idx = futures[future]
+            for other, idx in futures.items():
+                if idx > best_idx:
+                    other.cancel()
+    return None if best is None else best - low
+
+
+def main():
+    with open("input.txt", "r") as fhandle:
+        message = fhandle.read().strip()
+    # both window sizes in a single scan
+    markers = get_markers(message, (4, 14))
+    answer_1, answer_2 = markers[4], markers[14]
+
+    print("Part 1")
+    print("tests...")
+    print(get_marker_n_leading_characters("bvwbjplbgvbhsrlpgdmjqwftvncz"))
+    print(get_marker_n_leading_characters("nppdvjthqldpwncqszvftbrmjlhg"))
+    print(get_marker_n_leading_characters("nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg"))
+    print(get_marker_n_leading_characters("zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw"))
+    print("part 1 answer")
+    print(answer_1)
+
+    print("Part 2")
+    print("tests...")
+    print(get_marker_n_leading_characters(
+        "bvwbjplbgvbhsrlpgdmjqwftvncz", marker_nchars=14))
+    print(get_marker_n_leading_characters(
+        "nppdvjthqldpwncqszvftbrmjlhg", marker_nchars=14))
+    print(get_marker_n_leading_characters(
+        "nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg", marker_nchars=14))
+    print(get_marker_n_leading_characters(
+        "zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw", marker_nchars=14))
+    print("part 2 answer")
+    print(answer_2)
+
+
+if __name__ == "__main__":
+    # aoc2022 examples
+    examples = {
+        "mjqjpqmgbljsphdztnvjfqwrcgsmlb": {4: 7, 14: 19},
+        "bvwbjplbgvbhsrlpgdmjqwftvncz": {4: 5, 14: 23},
+        "nppdvjthqldpwncqszvftbrmjlhg": {4: 6, 14: 23},
+        "nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg": {4: 10, 14: 29},
+        "zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw": {4: 11, 14: 26},
+    }
+    for string, markers in examples.items():
+        assert get_markers(string) == markers
+        for marker_nchars, marker in markers.items():
+            assert get_marker_n_leading_characters(string, marker_nchars) == marker
+            assert __get_marker_n_leading_characters_reference(string, marker_nchars) == marker
+    # no marker at all
+    assert get_marker_n_leading_characters("aaaaaaa") is None
+    assert get_markers("abcabc", (2, 3, 4)) == {2: 2, 3: 3, 4: None}
+
+    # streaming over chunk boundaries gives the same markers
+    with open("input.txt", "rb") as fhandle:
+        message = fhandle.read().strip()
+    for marker_nchars in (4, 14):
+        expected = get_marker_n_leading_characters(message.decode(), marker_nchars)
+        for chunk_size in (1, 3, 13, 1 << 16):
+            chunks = (message[i:i + chunk_size] for i in range(0, len(message), chunk_size))
+            assert next(stream_markers(chunks, marker_nchars)) == expected
+        with open("input.txt", "rb") as fhandle:
+            assert next(stream_markers(fhandle, marker_nchars, chunk_size=7)) == expected
+    assert list(stream_markers([b"ab", b"ca", b"bc"], 3, every=True)) == [3, 4, 5, 6]
+    assert list(stream_markers([b"ab", b"cc", b"ab"], 3, every=True)) == [3, 6]
+    assert list(stream_markers(iter([b"aaaa"]), 2)) == []
+
+    # the parallel search agrees with the serial one for every window size
+    for marker_nchars in range(1, 15):
+        expected = get_marker_n_leading_characters(message.decode(), marker_nchars)
+        for chunk_size in (5, 100, 1 << 24):
+            assert parallel_marker_search("input.txt", marker_nchars, workers=4,
+                                          chunk_size=chunk_size) == expected
+
+    main()